@@ -0,0 +1,71 @@
+"""
+Cost of /historical_report aggregations over a year of 5-second readings.
+
+Run from the repository root:
+    python -m backend.benchmarks.aggregation_benchmark --methods mean,min,max,p95
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from backend.historical_data.aggregation import aggregate, parse_aggregation_methods, PERIOD_RULES
+from backend.historical_data.web_models import AggrPeriod
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the historical report aggregation engine.")
+    parser.add_argument("--days", type=int, default=365, help="Length of the series in days.")
+    parser.add_argument("--interval", type=int, default=5, help="Seconds between readings.")
+    parser.add_argument("--methods", default="mean,min,max,p95", help="Comma separated aggregation methods.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement, the best one is reported.")
+    return parser.parse_args()
+
+
+def _per_method_report(values: pd.Series, period: AggrPeriod, methods: list[str]) -> list[pd.DataFrame]:
+    # the previous implementation: one request (and one resample) per method, NaNs filled cell by cell
+    reports = []
+
+    for method in methods:
+        resampler = values.resample(PERIOD_RULES[period])
+        if method == "rolling_mean":
+            report = resampler.mean().rolling(window=3, min_periods=1).mean().reset_index()
+        elif method.startswith("p"):
+            report = resampler.quantile(float(method[1:]) / 100).reset_index()
+        else:
+            report = getattr(resampler, method)().reset_index()
+        reports.append(report.map(lambda x: 0 if pd.isna(x) else x))
+
+    return reports
+
+
+def _best_of(repeat: int, function) -> float:
+    timings = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+
+def main():
+    args = parse_args()
+    methods = parse_aggregation_methods(args.methods)
+
+    index = pd.date_range("2025-01-01", periods=args.days * 86400 // args.interval, freq=f"{args.interval}s",
+                          tz="UTC")
+    values = pd.Series(np.random.default_rng(0).normal(21, 3, len(index)), index=index, name="value")
+    print(f"{len(values):,} readings, methods: {', '.join(methods)}")
+
+    print(f"{'period':<10} {'per method ms':>14} {'engine ms':>10}")
+    for period in AggrPeriod:
+        legacy = _best_of(args.repeat, lambda: _per_method_report(values, period, methods))
+        engine = _best_of(args.repeat, lambda: aggregate(values, period, methods))
+        print(f"{period.value:<10} {legacy * 1000:14.1f} {engine * 1000:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
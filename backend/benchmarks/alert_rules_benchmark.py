@@ -0,0 +1,64 @@
+"""
+Per-reading cost of the alert rule engine, checked against a fixed budget.
+
+Run from the repository root:
+    python -m backend.benchmarks.alert_rules_benchmark --budget-us 10
+"""
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from backend.data_fetching.alerts import RuleEngine, AlertRules, SensorRules
+from backend.shared_models.sensor_data_model import DataResponse
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the alert rule engine.")
+    parser.add_argument("--sensors", type=int, default=600, help="Number of sensors.")
+    parser.add_argument("--readings", type=int, default=200, help="Readings per sensor.")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Readings per ingestion batch.")
+    parser.add_argument("--budget-us", type=float, default=10, help="Allowed microseconds per reading.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    rng = np.random.default_rng(0)
+    start_date = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+    values = rng.normal(22, 1, (args.readings, args.sensors))
+    # a few spikes, so that the alerting branches run as well
+    values[rng.random(values.shape) < 0.001] = 40
+
+    readings = [
+        DataResponse.model_construct(
+            id=f"{sensor}-{i}", device_id=f"device-{sensor}", sensor_type="temperature", value=float(values[i, sensor]),
+            unit="°C", timestamp=start_date + timedelta(seconds=5 * i), location=f"room-{sensor % 200}",
+            latitude=44.4352, longitude=26.0478, floor=sensor % 5,
+        )
+        for i in range(args.readings)
+        for sensor in range(args.sensors)
+    ]
+
+    engine = RuleEngine(AlertRules(defaults={"temperature": SensorRules(min=12, max=30, max_rate=60, z_score=6)}))
+
+    alerts = 0
+    start = time.perf_counter()
+    for offset in range(0, len(readings), args.batch_size):
+        alerts += len(engine.evaluate_batch(readings[offset:offset + args.batch_size]))
+    elapsed = time.perf_counter() - start
+
+    per_reading_us = elapsed / len(readings) * 1e6
+    print(f"{len(readings):,} readings, {alerts} alerts, {per_reading_us:.2f} us per reading "
+          f"(budget {args.budget_us} us)")
+
+    if per_reading_us > args.budget_us:
+        print("Over budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
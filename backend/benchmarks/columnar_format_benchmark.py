@@ -0,0 +1,50 @@
+"""
+Serialisation cost and payload size of the sensor data response formats.
+
+Run from the repository root:
+    python -m backend.benchmarks.columnar_format_benchmark --points 100000
+"""
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+from backend.shared_models.sensor_data_model import DataResponse, ResponseFormat
+from backend.utils.columnar import columnar_response
+from backend.utils.sensor_codec import data_responses_adapter
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark object vs columnar sensor responses.")
+    parser.add_argument("--points", type=int, default=100_000, help="Points per series.")
+    parser.add_argument("--series", type=int, default=3, help="Number of series.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    start_date = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+    readings = [
+        DataResponse.model_construct(
+            id=f"{series}-{i}", device_id=f"device-{series}", sensor_type="temperature", value=20 + (i % 100) / 10,
+            unit="°C", timestamp=start_date + timedelta(seconds=5 * i), location="EC105",
+            latitude=44.4352, longitude=26.0478, floor=1,
+        )
+        for series in range(args.series)
+        for i in range(args.points)
+    ]
+
+    start = time.perf_counter()
+    payload = data_responses_adapter.dump_json(readings)
+    elapsed = time.perf_counter() - start
+    print(f"{'objects':<10} {elapsed * 1000:9.1f} ms {len(payload) / 1e6:9.2f} MB")
+
+    for response_format in (ResponseFormat.COLUMNAR, ResponseFormat.ARROW):
+        start = time.perf_counter()
+        payload = columnar_response(readings, response_format).body
+        elapsed = time.perf_counter() - start
+        print(f"{response_format.value:<10} {elapsed * 1000:9.1f} ms {len(payload) / 1e6:9.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
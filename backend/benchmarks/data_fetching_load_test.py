@@ -0,0 +1,113 @@
+"""
+Load test for the data_fetching service: concurrent /real_time_data readers while webhooks stream in.
+
+Start the service first, then run from the repository root:
+    python -m backend.benchmarks.data_fetching_load_test --url http://localhost:8000 --readers 200
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timezone
+
+import httpx
+
+SENSOR_TYPES = ("temperature", "humidity", "pressure")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load test /real_time_data under webhook ingestion.")
+    parser.add_argument("--url", default="http://localhost:8000", help="Base URL of the data_fetching service.")
+    parser.add_argument("--readers", type=int, default=200, help="Number of concurrent readers.")
+    parser.add_argument("--duration", type=float, default=30, help="Test duration in seconds.")
+    parser.add_argument("--locations", type=int, default=100, help="Number of simulated locations.")
+    parser.add_argument("--devices_per_location", type=int, default=3, help="Devices per simulated location.")
+    parser.add_argument("--webhook_rate", type=float, default=20, help="Webhook batches posted per second.")
+    parser.add_argument("--batch_size", type=int, default=50, help="Readings per webhook batch.")
+    return parser.parse_args()
+
+
+def _percentile(latencies: list[float], percentile: float) -> float:
+    if len(latencies) < 2:
+        return latencies[0] if latencies else float("nan")
+    return statistics.quantiles(latencies, n=100, method="inclusive")[int(percentile) - 1]
+
+
+def _random_reading(args) -> dict:
+    location = random.randrange(args.locations)
+    sensor_type = random.choice(SENSOR_TYPES)
+
+    return {
+        "id": str(uuid.uuid4()),
+        "device_id": f"device-{location}-{random.randrange(args.devices_per_location)}",
+        "sensor_type": sensor_type,
+        "value": round(random.uniform(0, 100), 2),
+        "unit": "",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "location": f"room-{location}",
+        "latitude": 0.0,
+        "longitude": 0.0,
+        "floor": location % 5,
+    }
+
+
+async def _reader(client: httpx.AsyncClient, args, deadline: float, latencies: list[float], errors: list[int]):
+    while time.perf_counter() < deadline:
+        params = {"location": f"room-{random.randrange(args.locations)}"}
+
+        start = time.perf_counter()
+        try:
+            response = await client.get("/real_time_data", params=params)
+            response.raise_for_status()
+        except httpx.HTTPError:
+            errors[0] += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+async def _webhook_writer(client: httpx.AsyncClient, args, deadline: float, latencies: list[float]):
+    interval = 1 / args.webhook_rate
+
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        await client.post("/webhook", json=[_random_reading(args) for _ in range(args.batch_size)])
+        latencies.append(time.perf_counter() - start)
+
+        await asyncio.sleep(max(0.0, interval - (time.perf_counter() - start)))
+
+
+def _report(name: str, latencies: list[float], duration: float):
+    if not latencies:
+        print(f"{name:<16} no successful requests")
+        return
+
+    print(f"{name:<16} {len(latencies):7d} requests {len(latencies) / duration:9.1f} req/s "
+          f"p50 {_percentile(latencies, 50) * 1000:8.2f} ms p99 {_percentile(latencies, 99) * 1000:8.2f} ms")
+
+
+async def main():
+    args = parse_args()
+
+    limits = httpx.Limits(max_connections=args.readers + 1, max_keepalive_connections=args.readers + 1)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30) as client:
+        # seed every location so readers get non-empty results
+        for _ in range(args.locations * args.devices_per_location // args.batch_size + 1):
+            await client.post("/webhook", json=[_random_reading(args) for _ in range(args.batch_size)])
+
+        read_latencies, webhook_latencies, errors = [], [], [0]
+        deadline = time.perf_counter() + args.duration
+
+        await asyncio.gather(
+            _webhook_writer(client, args, deadline, webhook_latencies),
+            *(_reader(client, args, deadline, read_latencies, errors) for _ in range(args.readers)),
+        )
+
+    _report("/real_time_data", read_latencies, args.duration)
+    _report("/webhook", webhook_latencies, args.duration)
+    print(f"reader errors: {errors[0]}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+"""
+Bytes on the wire and encode/decode time of the historical export formats.
+
+Run from the repository root:
+    python -m backend.benchmarks.export_format_benchmark --rows 1000000
+"""
+import argparse
+import io
+import time
+
+import numpy as np
+import pandas as pd
+
+from backend.historical_data.export_formats import encode_frame
+from backend.historical_data.web_models import DataFormat, Compression
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark CSV vs Parquet vs Arrow exports.")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Number of raw readings.")
+    return parser.parse_args()
+
+
+def _raw_export_frame(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    sensor_types = np.array(["temperature", "humidity", "pressure"])
+
+    return pd.DataFrame({
+        "id": [f"reading-{i}" for i in range(rows)],
+        "device_id": "device-042",
+        "sensor_type": sensor_types[np.arange(rows) % 3],
+        "value": np.round(rng.normal(21, 3, rows), 2),
+        "unit": "°C",
+        "timestamp": pd.date_range("2025-01-01", periods=rows, freq="5s", tz="UTC"),
+        "location": "EC105",
+        "latitude": 44.4352,
+        "longitude": 26.0478,
+        "floor": 1,
+    })
+
+
+def _timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def main():
+    args = parse_args()
+    df = _raw_export_frame(args.rows)
+
+    def csv_encode():
+        stream = io.StringIO()
+        df.to_csv(stream, index=False)
+        return stream.getvalue().encode()
+
+    cases = [("csv", csv_encode, lambda payload: pd.read_csv(io.BytesIO(payload)))]
+
+    if pa is not None:
+        for compression in (Compression.NONE, Compression.SNAPPY, Compression.ZSTD):
+            cases.append((f"parquet/{compression.value}",
+                          lambda c=compression: encode_frame(df, DataFormat.PARQUET, c),
+                          lambda payload: pq.read_table(io.BytesIO(payload)).to_pandas()))
+        for compression in (Compression.NONE, Compression.LZ4, Compression.ZSTD):
+            cases.append((f"arrow/{compression.value}",
+                          lambda c=compression: encode_frame(df, DataFormat.ARROW, c),
+                          lambda payload: pa.ipc.open_stream(payload).read_pandas()))
+    else:
+        print("pyarrow is not installed, only csv is measured")
+
+    print(f"{'format':<16} {'size MB':>9} {'encode ms':>10} {'decode ms':>10}")
+    for name, encode, decode in cases:
+        payload, encode_time = _timed(encode)
+        _, decode_time = _timed(lambda: decode(payload))
+        print(f"{name:<16} {len(payload) / 1e6:9.2f} {encode_time * 1000:10.1f} {decode_time * 1000:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Speedup of the parallel forecasting runner with the number of worker processes, from scratch, then of a
+second run refitted from the models stored by the first one.
+
+Fits the real models on synthetic three-month hourly series, without the upstream API or the database.
+Run from the backend directory (the predict package uses top-level imports):
+    python -m benchmarks.forecast_benchmark --locations 8
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ["FORECAST_MODEL_DIR"] = tempfile.mkdtemp(prefix="forecast_models_")
+
+from predict.compute_future_values import run_forecasts, model_registry, SENSOR_MODELS  # noqa: E402
+
+HOURS = 24 * 91
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the parallel forecasting runner.")
+    parser.add_argument("--locations", type=int, default=8, help="Number of synthetic locations.")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count(), help="Largest pool to measure.")
+    return parser.parse_args()
+
+
+async def _synthetic_series(_client, _semaphore, location: str, sensor_type: str):
+    rng = np.random.default_rng(abs(hash((location, sensor_type))) % 2 ** 32)
+    index = pd.date_range("2025-01-01", periods=HOURS, freq="h", tz="UTC", name="timestamp")
+    daily_cycle = np.sin(2 * np.pi * np.arange(HOURS) / 24)
+    series = pd.DataFrame({"value": 21 + 3 * daily_cycle + rng.normal(0, 0.5, HOURS)}, index=index)
+
+    return series, index[-1].to_pydatetime()
+
+
+def _fit_only(location: str, sensor_type: str, series: pd.DataFrame, last_timestamp) -> int:
+    run_model = SENSOR_MODELS[sensor_type]
+    predictions, record = run_model(series, last_timestamp, model_registry.latest(location, sensor_type))
+    model_registry.save(location, sensor_type, record)
+
+    return len(predictions)
+
+
+def main():
+    args = parse_args()
+    tasks = [(f"room-{i}", sensor_type) for sensor_type in SENSOR_MODELS for i in range(args.locations)]
+
+    workers = 1
+    baseline = None
+    rows = []
+
+    while workers <= args.max_workers:
+        shutil.rmtree(model_registry.root, ignore_errors=True)
+
+        start = time.perf_counter()
+        run_forecasts(tasks, workers, load=_synthetic_series, forecast=_fit_only)
+        elapsed = time.perf_counter() - start
+
+        baseline = baseline or elapsed
+        rows.append((workers, elapsed, baseline / elapsed))
+        workers *= 2
+
+    # the registry now holds the models of the last (largest) pool
+    start = time.perf_counter()
+    run_forecasts(tasks, rows[-1][0], load=_synthetic_series, forecast=_fit_only)
+    warm = time.perf_counter() - start
+    shutil.rmtree(model_registry.root, ignore_errors=True)
+
+    print(f"{len(tasks)} forecasts")
+    print(f"{'workers':>7} {'seconds':>9} {'speedup':>8}")
+    for workers, elapsed, speedup in rows:
+        print(f"{workers:>7} {elapsed:9.1f} {speedup:8.2f}")
+    print(f"warm refit with {rows[-1][0]} workers: {warm:.1f} s ({rows[-1][1] / warm:.2f}x faster than from scratch)")
+
+
+if __name__ == "__main__":
+    main()
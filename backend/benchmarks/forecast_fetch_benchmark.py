@@ -0,0 +1,99 @@
+"""
+Time to fetch the forecasting history of a whole building: one synchronous client per request, one sensor
+after the other, against concurrent paged requests over one pooled client.
+
+Starts a local stub of the historical sensor API with a fixed latency per request, then run from the backend
+directory (the predict package uses top-level imports):
+    python -m benchmarks.forecast_fetch_benchmark --locations 100 --latency 200
+"""
+import argparse
+import asyncio
+import os
+import threading
+import time
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Response
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from predict.compute_future_values import get_sensor_history, history_pages, FORECAST_FETCH_CONCURRENCY  # noqa: E402
+from utils.http_client import create_async_client  # noqa: E402
+
+SENSOR_TYPES = ("temperature", "humidity", "pressure")
+
+stub_app = FastAPI()
+stub_latency = 0.0
+stub_page = b"[]"
+
+
+@stub_app.get("/data")
+async def stub_data():
+    await asyncio.sleep(stub_latency)
+    return Response(stub_page, media_type="application/json")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark sequential vs concurrent forecast history fetches.")
+    parser.add_argument("--locations", type=int, default=100, help="Number of locations.")
+    parser.add_argument("--latency", type=float, default=200, help="Stub latency per request, in ms.")
+    parser.add_argument("--rows", type=int, default=500, help="Readings per response.")
+    parser.add_argument("--port", type=int, default=18081, help="Port of the local stub server.")
+    return parser.parse_args()
+
+
+def _sequential(url: str, locations: list[str]):
+    # the former get_historical_data: a new client per sensor, one request for the whole window
+    for location in locations:
+        for sensor_type in SENSOR_TYPES:
+            with httpx.Client() as client:
+                response = client.get(url, params={"sensor_type": sensor_type, "location": location})
+                response.raise_for_status()
+                _ = response.json() if response.json() else None
+
+
+async def _concurrent(locations: list[str]):
+    semaphore = asyncio.Semaphore(FORECAST_FETCH_CONCURRENCY)
+
+    async with create_async_client() as client:
+        await asyncio.gather(*(get_sensor_history(client, semaphore, location, sensor_type)
+                               for location in locations for sensor_type in SENSOR_TYPES))
+
+
+async def main():
+    global stub_latency, stub_page
+    args = parse_args()
+
+    stub_latency = args.latency / 1000
+    stub_page = ("[" + ",".join(
+        f'{{"id":"{i}","device_id":"device-1","sensor_type":"temperature","value":21.5,"unit":"C",'
+        f'"timestamp":"2025-03-01T12:00:{i % 60:02d}Z","location":"EC105","latitude":0,"longitude":0,"floor":1}}'
+        for i in range(args.rows)
+    ) + "]").encode()
+
+    url = f"http://127.0.0.1:{args.port}/data"
+    os.environ["HIST_SENSOR_DATA"] = url
+
+    server = uvicorn.Server(uvicorn.Config(stub_app, host="127.0.0.1", port=args.port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    locations = [f"room-{i}" for i in range(args.locations)]
+    requests = len(locations) * len(SENSOR_TYPES)
+
+    start = time.perf_counter()
+    await asyncio.to_thread(_sequential, url, locations)
+    print(f"{'sequential':<12} {requests:6} requests {time.perf_counter() - start:8.2f} s")
+
+    start = time.perf_counter()
+    await _concurrent(locations)
+    print(f"{'concurrent':<12} {requests * len(history_pages()):6} requests {time.perf_counter() - start:8.2f} s "
+          f"({FORECAST_FETCH_CONCURRENCY} in flight)")
+
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
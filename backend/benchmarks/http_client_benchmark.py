@@ -0,0 +1,94 @@
+"""
+Latency saved by reusing one pooled httpx.AsyncClient instead of opening a client per request.
+
+Starts a local stub of the historical sensor API, then run from the repository root:
+    python -m backend.benchmarks.http_client_benchmark --requests 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+from backend.utils.http_client import create_async_client
+
+stub_app = FastAPI()
+
+STUB_PAYLOAD = [
+    {
+        "id": str(i), "device_id": "device-1", "sensor_type": "temperature", "value": 21.5, "unit": "°C",
+        "timestamp": "2025-03-01T12:00:00Z", "location": "EC105", "latitude": 0.0, "longitude": 0.0, "floor": 1,
+    }
+    for i in range(20)
+]
+
+
+@stub_app.get("/data")
+async def stub_data():
+    return STUB_PAYLOAD
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark per-request vs shared httpx clients.")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per scenario.")
+    parser.add_argument("--concurrency", type=int, default=50, help="Concurrent in-flight requests.")
+    parser.add_argument("--port", type=int, default=18080, help="Port of the local stub server.")
+    return parser.parse_args()
+
+
+async def _run(n_requests: int, concurrency: int, fetch) -> list[float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await fetch()
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(n_requests)))
+    return latencies
+
+
+def _report(name: str, latencies: list[float], elapsed: float):
+    quantiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    print(f"{name:<20} {len(latencies) / elapsed:9.1f} req/s "
+          f"p50 {quantiles[49] * 1000:7.2f} ms p99 {quantiles[98] * 1000:7.2f} ms")
+
+
+async def main():
+    args = parse_args()
+    url = f"http://127.0.0.1:{args.port}/data"
+
+    server = uvicorn.Server(uvicorn.Config(stub_app, host="127.0.0.1", port=args.port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    async def per_request_client():
+        async with httpx.AsyncClient() as client:
+            (await client.get(url)).raise_for_status()
+
+    start = time.perf_counter()
+    latencies = await _run(args.requests, args.concurrency, per_request_client)
+    _report("client per request", latencies, time.perf_counter() - start)
+
+    shared_client = create_async_client()
+
+    async def shared():
+        (await shared_client.get(url)).raise_for_status()
+
+    start = time.perf_counter()
+    latencies = await _run(args.requests, args.concurrency, shared)
+    _report("shared client", latencies, time.perf_counter() - start)
+
+    await shared_client.aclose()
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,111 @@
+"""
+Latency of the /last_prediction query on a large SQLite database: the former per sensor tables, which have no
+index, against the PredictedValue table and its (location, sensor_type, timestamp) index.
+
+Run from the backend directory (the predict package uses top-level imports):
+    python -m benchmarks.prediction_query_benchmark --rows 3000000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import Column, DateTime, Float, Integer, MetaData, String, Table, create_engine, insert, select, \
+    text
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from predict.database_model import Base, PredictedValue  # noqa: E402
+
+SENSOR_TYPES = ("temperature", "humidity", "pressure")
+FIRST_HOUR = datetime(2025, 1, 1)
+INSERT_BATCH = 100_000
+
+legacy_metadata = MetaData()
+legacy_tables = {
+    sensor_type: Table(
+        name, legacy_metadata,
+        Column("inc", Integer, primary_key=True, autoincrement=True),
+        Column("value", Float, nullable=False),
+        Column("location", String, nullable=False),
+        Column("timestamp", DateTime, nullable=False),
+    )
+    for sensor_type, name in zip(SENSOR_TYPES, ("TempPredictedValue", "HumidPredictedValue", "PressPredictedValue"))
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the last prediction query.")
+    parser.add_argument("--rows", type=int, default=3_000_000, help="Predicted values over all sensor types.")
+    parser.add_argument("--locations", type=int, default=1000, help="Number of locations.")
+    parser.add_argument("--queries", type=int, default=200, help="Queries measured on each layout.")
+    return parser.parse_args()
+
+
+def _fill(connection, hours: int, locations: list[str]):
+    for sensor_type in SENSOR_TYPES:
+        rows = [{"location": location, "timestamp": FIRST_HOUR + timedelta(hours=hour), "value": 21.0 + hour / 100}
+                for hour in range(hours) for location in locations]
+
+        for start in range(0, len(rows), INSERT_BATCH):
+            batch = rows[start:start + INSERT_BATCH]
+            connection.execute(insert(legacy_tables[sensor_type]), batch)
+            connection.execute(insert(PredictedValue), [{**row, "sensor_type": sensor_type, "run_id": "benchmark"}
+                                                        for row in batch])
+
+
+def _measure(name: str, connection, make_query, queries: list[tuple[str, str, datetime]]):
+    statement = make_query(*queries[0])
+    plan = connection.execute(text("EXPLAIN QUERY PLAN " + str(statement.compile(
+        connection, compile_kwargs={"literal_binds": True})))).fetchall()
+
+    rows = 0
+    start = time.perf_counter()
+    for query in queries:
+        rows += len(connection.execute(make_query(*query)).fetchall())
+    elapsed = time.perf_counter() - start
+
+    print(f"{name:<16} {elapsed / len(queries) * 1000:9.3f} ms/query  {rows // len(queries):5} rows  "
+          f"plan: {'; '.join(row[-1] for row in plan)}")
+
+
+def main():
+    args = parse_args()
+    locations = [f"room-{i}" for i in range(args.locations)]
+    hours = args.rows // (len(SENSOR_TYPES) * len(locations))
+
+    rng = random.Random(0)
+    queries = [(rng.choice(locations), rng.choice(SENSOR_TYPES), FIRST_HOUR + timedelta(hours=hours - 48))
+               for _ in range(args.queries)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{directory}/predictions.db")
+        Base.metadata.create_all(bind=engine)
+        legacy_metadata.create_all(bind=engine)
+
+        start = time.perf_counter()
+        with engine.begin() as connection:
+            _fill(connection, hours, locations)
+        print(f"{hours * len(locations) * len(SENSOR_TYPES)} rows in each layout, filled in "
+              f"{time.perf_counter() - start:.1f} s")
+
+        with engine.connect() as connection:
+            _measure("per sensor table", connection, lambda location, sensor_type, cutoff: select(
+                legacy_tables[sensor_type].c.value, legacy_tables[sensor_type].c.timestamp).where(
+                legacy_tables[sensor_type].c.location == location,
+                legacy_tables[sensor_type].c.timestamp > cutoff,
+            ), queries)
+            _measure("PredictedValue", connection, lambda location, sensor_type, cutoff: select(
+                PredictedValue.value, PredictedValue.timestamp).where(
+                PredictedValue.location == location,
+                PredictedValue.sensor_type == sensor_type,
+                PredictedValue.timestamp > cutoff,
+            ).order_by(PredictedValue.timestamp), queries)
+
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
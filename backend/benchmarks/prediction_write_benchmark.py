@@ -0,0 +1,102 @@
+"""
+Time to store the predictions of a run: delete every row and add them back as ORM objects, against replacing
+the predictions of each location in its own transaction with bulk inserts.
+
+Also counts how many reads, made by a concurrent reader during the run, found no prediction for their location.
+Run from the backend directory (the predict package uses top-level imports):
+    python -m benchmarks.prediction_write_benchmark --locations 500
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, select, func
+from sqlalchemy.orm import sessionmaker
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from predict.compute_future_values import replace_predictions  # noqa: E402
+from predict.database_model import Base, PredictedValue  # noqa: E402
+
+HORIZON = 48
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark storing the predictions of a forecast run.")
+    parser.add_argument("--locations", type=int, default=500, help="Number of locations.")
+    return parser.parse_args()
+
+
+def _predictions(run: int) -> list:
+    start = datetime(2025, 3, 1) + timedelta(days=run)
+    return [(start + timedelta(hours=hour), 21.0 + run + hour / 100) for hour in range(HORIZON)]
+
+
+def _delete_all_then_add(session_factory, locations: list[str], run: int):
+    with session_factory() as db:
+        db.query(PredictedValue).delete()
+        db.commit()
+
+    for location in locations:
+        with session_factory() as db:
+            db.add_all([PredictedValue(sensor_type="temperature", value=val, location=location, timestamp=ts,
+                                       run_id=str(run)) for ts, val in _predictions(run)])
+            db.commit()
+
+
+def _replace_per_location(session_factory, locations: list[str], run: int):
+    for location in locations:
+        with session_factory() as db:
+            replace_predictions(db, location, "temperature", str(run), _predictions(run))
+
+
+def _measure(name: str, store, locations: list[str]):
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{directory}/predictions.db", connect_args={"timeout": 30})
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        store(session_factory, locations, 0)
+
+        done = threading.Event()
+        reads, empty_reads = 0, 0
+
+        def reader():
+            nonlocal reads, empty_reads
+            with engine.connect() as connection:
+                while not done.is_set():
+                    location = locations[reads % len(locations)]
+                    count = connection.execute(select(func.count()).select_from(PredictedValue)
+                                               .where(PredictedValue.location == location)).scalar()
+                    connection.rollback()
+                    reads += 1
+                    empty_reads += count == 0
+
+        thread = threading.Thread(target=reader)
+        thread.start()
+
+        start = time.perf_counter()
+        store(session_factory, locations, 1)
+        elapsed = time.perf_counter() - start
+
+        done.set()
+        thread.join()
+        engine.dispose()
+
+    print(f"{name:<24} {elapsed:8.3f} s  {empty_reads:6} of {reads} reads found no prediction")
+
+
+def main():
+    args = parse_args()
+    locations = [f"room-{i}" for i in range(args.locations)]
+
+    print(f"{len(locations)} locations, {HORIZON} predicted values each")
+    _measure("delete all, then add_all", _delete_all_then_add, locations)
+    _measure("replace per location", _replace_per_location, locations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Micro-benchmark for the per-entry cost of decoding cached real-time readings.
+
+Run from the repository root:
+    python -m backend.benchmarks.sensor_codec_benchmark --entries 100000
+"""
+import argparse
+import timeit
+from datetime import datetime, timezone
+
+from backend.shared_models.sensor_data_model import DataResponse
+from backend.utils.sensor_codec import CODECS
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark cached reading codecs.")
+    parser.add_argument("--entries", type=int, default=100_000, help="Number of decodes per codec.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    entry = DataResponse(
+        id="6f1c2a4e-0d1b-4c55-9a55-7f2f0c1f8b11",
+        device_id="device-042",
+        sensor_type="temperature",
+        value=21.37,
+        unit="°C",
+        timestamp=datetime(2025, 3, 1, 12, 30, 5, tzinfo=timezone.utc),
+        location="EC105",
+        latitude=44.4352,
+        longitude=26.0478,
+        floor=1,
+    )
+
+    # what the services did before the codec layer: eval() of the stored JSON, then model_validate
+    legacy_raw = entry.model_dump_json()
+    legacy = timeit.timeit(lambda: DataResponse.model_validate(eval(legacy_raw)), number=args.entries)
+    print(f"{'eval + model_validate':<24} {legacy / args.entries * 1e6:8.2f} us/entry "
+          f"{len(legacy_raw.encode()):5d} bytes")
+
+    for name, codec in CODECS.items():
+        raw = codec.encode(entry)
+        assert codec.decode(raw) == entry
+
+        encode = timeit.timeit(lambda: codec.encode(entry), number=args.entries)
+        decode = timeit.timeit(lambda: codec.decode(raw), number=args.entries)
+        print(f"{name:<24} {decode / args.entries * 1e6:8.2f} us/entry "
+              f"{len(raw.encode()):5d} bytes (encode {encode / args.entries * 1e6:.2f} us/entry)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+import asyncio
+import json
+import math
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from prometheus_client import Counter, Histogram
+from pydantic import BaseModel
+
+from backend.shared_models.sensor_data_model import DataResponse
+
+ALERTS_TRIGGERED = Counter('alerts_triggered', 'Alerts raised by the rule engine', ['rule'])
+RULE_EVALUATION = Histogram('alert_rule_evaluation_seconds', 'Duration of the rule evaluation of one batch')
+ALERT_EMAILS = Counter('alert_emails', 'Alert summary emails sent to the email service', ['status'])
+
+
+# bits of _SensorState.active, plain ints because enum flag arithmetic is slow on the ingestion path
+MIN_RULE = 1
+MAX_RULE = 2
+RATE_RULE = 4
+Z_SCORE_RULE = 8
+
+RULE_NAMES = {MIN_RULE: "min", MAX_RULE: "max", RATE_RULE: "rate", Z_SCORE_RULE: "z_score"}
+
+
+class SensorRules(BaseModel):
+    min: Optional[float] = None
+    max: Optional[float] = None
+    # largest accepted change, in units per minute
+    max_rate: Optional[float] = None
+    # largest accepted distance from the exponentially weighted mean, in standard deviations
+    z_score: Optional[float] = None
+
+
+class AlertRules(BaseModel):
+    """
+    Rules by sensor type, with per-location overrides of single fields:
+
+        {"defaults": {"temperature": {"max": 30}}, "locations": {"EC105": {"temperature": {"max": 26}}}}
+    """
+    defaults: Dict[str, SensorRules] = {}
+    locations: Dict[str, Dict[str, SensorRules]] = {}
+
+    def for_sensor(self, location: str, sensor_type: str) -> Optional[SensorRules]:
+        rules = self.defaults.get(sensor_type)
+        override = self.locations.get(location, {}).get(sensor_type)
+
+        if override is not None:
+            rules = (rules or SensorRules()).model_copy(update=override.model_dump(exclude_unset=True))
+
+        return rules
+
+
+class Alert(BaseModel):
+    rule: str
+    location: str
+    device_id: str
+    sensor_type: str
+    value: float
+    limit: float
+    timestamp: datetime
+    message: str
+
+
+class _SensorState:
+    """
+    Everything the rules remember about one sensor: O(1) memory and O(1) work per reading.
+    """
+    __slots__ = ("rules", "last_value", "last_time", "mean", "variance", "count", "active")
+
+    def __init__(self, rules: Optional[SensorRules]):
+        self.rules = rules
+        self.last_value = 0.0
+        self.last_time = None
+        self.mean = 0.0
+        self.variance = 0.0
+        self.count = 0
+        # rules currently violated; an alert is raised only when a rule starts being violated
+        self.active = 0
+
+
+class RuleEngine:
+    """
+    Evaluates the threshold, rate-of-change and rolling z-score rules on every ingested reading.
+
+    The z-score is measured against an exponentially weighted mean and variance (`alpha` is the weight
+    of the newest reading), and only once the sensor reported `warmup` readings.
+    """
+
+    def __init__(self, rules: AlertRules, alpha: float = 0.05, warmup: int = 30):
+        self.rules = rules
+        self.alpha = alpha
+        self.warmup = warmup
+        self._states: Dict[tuple[str, str, str], _SensorState] = {}
+
+    @staticmethod
+    def _raise(state: _SensorState, rule: int, entry: DataResponse, limit: float, message: str,
+               alerts: List[Alert]):
+        if state.active & rule:
+            return
+
+        state.active |= rule
+        ALERTS_TRIGGERED.labels(rule=RULE_NAMES[rule]).inc()
+        alerts.append(Alert(
+            rule=RULE_NAMES[rule],
+            location=entry.location,
+            device_id=entry.device_id,
+            sensor_type=entry.sensor_type,
+            value=entry.value,
+            limit=limit,
+            timestamp=entry.timestamp,
+            message=message,
+        ))
+
+    def evaluate(self, entry: DataResponse, alerts: List[Alert]):
+        key = (entry.device_id, entry.sensor_type, entry.location)
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = _SensorState(self.rules.for_sensor(entry.location, entry.sensor_type))
+
+        rules = state.rules
+        if rules is None:
+            return
+
+        value = entry.value
+        reading_time = entry.timestamp.timestamp()
+
+        if state.last_time is not None and reading_time <= state.last_time:
+            # late or repeated reading, the state already moved past it
+            return
+
+        if rules.max is not None:
+            if value > rules.max:
+                self._raise(state, MAX_RULE, entry, rules.max,
+                            f"{entry.sensor_type} in {entry.location} is {value} (above {rules.max})", alerts)
+            else:
+                state.active &= ~MAX_RULE
+
+        if rules.min is not None:
+            if value < rules.min:
+                self._raise(state, MIN_RULE, entry, rules.min,
+                            f"{entry.sensor_type} in {entry.location} is {value} (below {rules.min})", alerts)
+            else:
+                state.active &= ~MIN_RULE
+
+        if rules.max_rate is not None and state.last_time is not None:
+            rate = abs(value - state.last_value) * 60 / (reading_time - state.last_time)
+            if rate > rules.max_rate:
+                self._raise(state, RATE_RULE, entry, rules.max_rate,
+                            f"{entry.sensor_type} in {entry.location} changes by {rate:.2f}/min "
+                            f"(more than {rules.max_rate})", alerts)
+            else:
+                state.active &= ~RATE_RULE
+
+        delta = value - state.mean
+        if rules.z_score is not None and state.count >= self.warmup and state.variance > 0:
+            z_score = abs(delta) / math.sqrt(state.variance)
+            if z_score > rules.z_score:
+                self._raise(state, Z_SCORE_RULE, entry, rules.z_score,
+                            f"{entry.sensor_type} in {entry.location} is {value}, {z_score:.1f} standard deviations "
+                            f"from its recent mean {state.mean:.2f}", alerts)
+            else:
+                state.active &= ~Z_SCORE_RULE
+
+        if state.count == 0:
+            state.mean = value
+        else:
+            state.mean += self.alpha * delta
+            state.variance = (1 - self.alpha) * (state.variance + self.alpha * delta * delta)
+
+        state.count += 1
+        state.last_value = value
+        state.last_time = reading_time
+
+    def evaluate_batch(self, entries: List[DataResponse]) -> List[Alert]:
+        alerts = []
+
+        with RULE_EVALUATION.time():
+            # the state of a sensor must see its readings in chronological order
+            for entry in sorted(entries, key=lambda entry: entry.timestamp):
+                self.evaluate(entry, alerts)
+
+        return alerts
+
+
+def load_rules(path: Optional[str]) -> AlertRules:
+    if not path:
+        return AlertRules()
+
+    with open(path) as rules_file:
+        return AlertRules.model_validate(json.load(rules_file))
+
+
+class AlertNotifier:
+    """
+    Collects alerts and hands them to `send` as one summary every `interval` seconds, so a burst of
+    alerts becomes a single email. At most `max_pending` alerts are listed, the rest are only counted.
+    """
+
+    def __init__(self, send: Callable[[str, str], Awaitable[None]], interval: float, max_pending: int = 200):
+        self.send = send
+        self.interval = interval
+        self.max_pending = max_pending
+
+        self._pending: List[Alert] = []
+        self._omitted = 0
+
+    def add(self, alerts: List[Alert]):
+        room = self.max_pending - len(self._pending)
+
+        self._pending.extend(alerts[:max(room, 0)])
+        self._omitted += max(len(alerts) - max(room, 0), 0)
+
+    async def run(self):
+        try:
+            while True:
+                await asyncio.sleep(self.interval)
+                await self.flush()
+        finally:
+            await self.flush()
+
+    async def flush(self):
+        if not self._pending:
+            return
+
+        alerts, omitted = self._pending, self._omitted
+        self._pending, self._omitted = [], 0
+
+        subject = f"UPB DT: {len(alerts) + omitted} sensor alert{'s' if len(alerts) + omitted > 1 else ''}"
+        lines = [f"[{alert.timestamp.isoformat()}] {alert.message}" for alert in alerts]
+        if omitted:
+            lines.append(f"... and {omitted} more")
+
+        try:
+            await self.send(subject, "\n".join(lines))
+            ALERT_EMAILS.labels(status="sent").inc()
+        except Exception as e:
+            ALERT_EMAILS.labels(status="failed").inc()
+            print(f"Failed to send the alert summary: {e}")
@@ -0,0 +1,64 @@
+import asyncio
+from typing import Iterable, Optional
+
+from backend.shared_models.sensor_data_model import DataResponse, RealTimeDataRequest
+from backend.utils.real_time_store import reading_key
+
+
+class Subscriber:
+    def __init__(self, real_time_req: RealTimeDataRequest, queue_size: int):
+        self.device_id = real_time_req.device_id
+        self.sensor_type = real_time_req.sensor_type
+        self.location = real_time_req.location
+        self.queue: asyncio.Queue[DataResponse] = asyncio.Queue(maxsize=queue_size)
+
+    def matches(self, entry: DataResponse) -> bool:
+        return (self.device_id is None or self.device_id == entry.device_id) \
+            and (self.sensor_type is None or self.sensor_type == entry.sensor_type) \
+            and (self.location is None or self.location == entry.location)
+
+    def push(self, entry: DataResponse):
+        # a slow client only loses its own oldest readings, it never stalls the others
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(entry)
+
+
+class ReadingBroadcaster:
+    """
+    In-process fan-out of new readings to the open /stream connections.
+
+    Subscribers are indexed by location, so a reading only visits the subscribers that can match it,
+    and readings whose value did not change since the last broadcast are not sent at all.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._by_location: dict[Optional[str], set[Subscriber]] = {}
+        self._last_values: dict[str, float] = {}
+
+    def subscribe(self, real_time_req: RealTimeDataRequest) -> Subscriber:
+        subscriber = Subscriber(real_time_req, self.queue_size)
+        self._by_location.setdefault(subscriber.location, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        subscribers = self._by_location.get(subscriber.location)
+        if subscribers is None:
+            return
+
+        subscribers.discard(subscriber)
+        if not subscribers:
+            del self._by_location[subscriber.location]
+
+    def publish(self, entries: Iterable[DataResponse]):
+        for entry in entries:
+            key = reading_key(entry.device_id, entry.sensor_type, entry.location)
+            if self._last_values.get(key) == entry.value:
+                continue
+            self._last_values[key] = entry.value
+
+            for location in (entry.location, None):
+                for subscriber in self._by_location.get(location, ()):
+                    if subscriber.matches(entry):
+                        subscriber.push(entry)
@@ -1,125 +1,523 @@
+import asyncio
 import os
-from typing import Dict, List, Tuple
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Tuple, Optional
 
 import httpx
-import redis
+import pandas as pd
+import redis.asyncio as redis
 import uvicorn
 from dotenv import load_dotenv
-from fastapi import FastAPI, Depends, Request, BackgroundTasks
+from fastapi import FastAPI, Depends, Request, Response, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from pydantic import ValidationError
+from redis.exceptions import RedisError
+
+from backend.data_fetching.alerts import RuleEngine, AlertNotifier, Alert, load_rules
+from backend.data_fetching.broadcaster import ReadingBroadcaster
+from backend.data_fetching.downsampling import downsample
+from backend.data_fetching.hist_cache import HistoricalDataCache
+from backend.data_fetching.ingestion import IngestionQueue, OverflowPolicy
+from backend.data_fetching.web_model import DownsamplingMethod
+from backend.shared_models.email_model import EmailRequest
+from backend.shared_models.sensor_data_model import DataResponse, HistDataRequest, RealTimeDataRequest, \
+    ResponseFormat
+from backend.utils.columnar import columnar_response
+from backend.utils.http_client import create_async_client
+from backend.utils.json_stream import iter_json_array
+from backend.utils.sensor_codec import encode_reading, decode_reading, data_responses_adapter
+from backend.utils.process_stats import peak_rss_mb
+from backend.utils.redis_lease import RedisLease
+from backend.utils.real_time_store import reading_key, split_reading_key, index_keys, query_index_keys, \
+    floor_locations_key, location_sensors_key, series_key, READINGS_CHANNEL, FLOORS_KEY, ALL_READINGS_INDEX, \
+    BOOTSTRAP_LOCK_KEY, ALERTS_KEY, ALERTS_CHANNEL, ALERTS_OWNER_KEY, INGESTED_CHANNEL
 
-from backend.shared_models.sensor_data_model import DataResponse, HistDataRequest, RealTimeDataRequest
+load_dotenv()
 
-app = FastAPI()
+# BlockingConnectionPool makes callers wait for a free connection instead of failing once the pool is exhausted
+redis_pool = redis.BlockingConnectionPool(host=os.getenv('REDIS_HOST'),
+                                          port=os.getenv('REDIS_PORT'),
+                                          decode_responses=True,
+                                          max_connections=int(os.getenv('REDIS_MAX_CONNECTIONS', 50)),
+                                          timeout=float(os.getenv('REDIS_POOL_TIMEOUT', 5)))
+redis_client = redis.Redis(connection_pool=redis_pool)
+
+http_client = create_async_client()
+
+hist_cache = HistoricalDataCache(
+    max_entries=int(os.getenv("HIST_CACHE_MAX_ENTRIES", 256)),
+    open_window_ttl=float(os.getenv("HIST_CACHE_OPEN_WINDOW_TTL", 10)),
+    closed_window_ttl=float(os.getenv("HIST_CACHE_CLOSED_WINDOW_TTL", 3600)),
+    redis_client=redis_client if os.getenv("HIST_CACHE_REDIS", "false").lower() == "true" else None,
+)
+ingestion_queue = IngestionQueue(
+    flush=lambda batch: update_real_time_data(batch),
+    max_size=int(os.getenv("INGESTION_QUEUE_SIZE", 50000)),
+    batch_size=int(os.getenv("INGESTION_BATCH_SIZE", 1000)),
+    flush_interval=float(os.getenv("INGESTION_FLUSH_INTERVAL", 0.2)),
+    policy=OverflowPolicy(os.getenv("INGESTION_OVERFLOW_POLICY", OverflowPolicy.REJECT)),
+)
+broadcaster = ReadingBroadcaster(queue_size=int(os.getenv("STREAM_QUEUE_SIZE", 100)))
+STREAM_KEEPALIVE = float(os.getenv("STREAM_KEEPALIVE", 15))
+RECENT_DATA_RETENTION = int(os.getenv("RECENT_DATA_RETENTION", 2 * 60 * 60))
+# delay before subscribing again after the Redis connection of a subscription failed, doubled up to the max
+PUBSUB_RECONNECT_DELAY = float(os.getenv("PUBSUB_RECONNECT_DELAY", 0.5))
+PUBSUB_RECONNECT_MAX_DELAY = float(os.getenv("PUBSUB_RECONNECT_MAX_DELAY", 30))
+
+alert_rules = load_rules(os.getenv("ALERT_RULES_FILE", os.path.join(os.path.dirname(__file__), "alert_rules.json")))
+ALERTS_ENABLED = bool(alert_rules.defaults or alert_rules.locations)
+# the rules keep per sensor state, so they run in a single process (whichever worker holds the lease) that sees
+# the readings ingested by every worker
+alerts_lease = RedisLease(redis_client, ALERTS_OWNER_KEY, ttl=float(os.getenv("ALERTS_OWNER_TTL", 15)))
+ALERT_HISTORY_SIZE = int(os.getenv("ALERT_HISTORY_SIZE", 1000))
+ALERT_EMAIL_RECIPIENT = os.getenv("ALERT_EMAIL_RECIPIENT")
+
+
+async def _bootstrap():
+    bootstrap_mode = os.getenv("BOOTSTRAP", "auto")
+    bootstrap_timeout = float(os.getenv("BOOTSTRAP_TIMEOUT", 300))
+
+    if bootstrap_mode == "never":
+        return
+
+    # the store outlives restarts, it only needs the history when it is empty
+    if bootstrap_mode == "auto" and await redis_client.exists(ALL_READINGS_INDEX):
+        print("Real-time store already populated, skipping bootstrap")
+        return
+
+    # with several workers only one of them downloads the history
+    if not await redis_client.set(BOOTSTRAP_LOCK_KEY, os.getpid(), nx=True, ex=int(bootstrap_timeout)):
+        print("Bootstrap already running in another worker")
+        return
+
+    try:
+        await init_construct(await _fetch_latest_readings(bootstrap_timeout))
+    finally:
+        await redis_client.delete(BOOTSTRAP_LOCK_KEY)
+
+
+async def _fetch_latest_readings(bootstrap_timeout: float) -> List[DataResponse]:
+    """
+    Streams the history of the last BOOTSTRAP_WINDOW_HOURS (the whole history when 0) and keeps only
+    the newest reading per key, so memory is bounded by the number of sensors and not by the history size.
+    """
+    start_time = time.perf_counter()
+    window_hours = float(os.getenv("BOOTSTRAP_WINDOW_HOURS", 24))
+    batch_size = int(os.getenv("BOOTSTRAP_BATCH_SIZE", 5000))
+
+    params = {}
+    if window_hours > 0:
+        now = datetime.now(timezone.utc)
+        params = {
+            "from": (now - timedelta(hours=window_hours)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            "to": now.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        }
+
+    latest_entries = {}
+    received = 0
+
+    def keep_latest(batch: List[Dict]):
+        for entry in _validate_batch(batch):
+            key = reading_key(entry.device_id, entry.sensor_type, entry.location)
+
+            if key not in latest_entries or latest_entries[key].timestamp <= entry.timestamp:
+                latest_entries[key] = entry
+
+    async with http_client.stream("GET", os.getenv("HIST_SENSOR_DATA"),
+                                  params=params, timeout=bootstrap_timeout) as response:
+        response.raise_for_status()
 
-load_dotenv()
+        batch = []
+        async for raw_entry in iter_json_array(response.aiter_bytes()):
+            batch.append(raw_entry)
+
+            if len(batch) >= batch_size:
+                received += len(batch)
+                keep_latest(batch)
+                batch = []
+
+        received += len(batch)
+        keep_latest(batch)
 
-redis_client = redis.Redis(host=os.getenv('REDIS_HOST'),
-                           port=os.getenv('REDIS_PORT'),
-                           decode_responses=True)
+    print(f"Bootstrap fetch: {received} readings received, {len(latest_entries)} kept "
+          f"in {time.perf_counter() - start_time:.2f} s, peak RSS {peak_rss_mb():.1f} MB")
 
-KEY_DELIM = "|"
+    return list(latest_entries.values())
 
-available_sensors = {}
-building_plan = {}
+
+async def _consume_channel(channel: str, handle: Callable[[str], Awaitable[None]]):
+    """
+    Passes every message published on `channel` to `handle`, subscribing again with exponential backoff
+    whenever the Redis connection fails. Messages published while disconnected are lost.
+    """
+    delay = PUBSUB_RECONNECT_DELAY
+
+    while True:
+        try:
+            async with redis_client.pubsub() as pubsub:
+                await pubsub.subscribe(channel)
+                delay = PUBSUB_RECONNECT_DELAY
+
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        await handle(message["data"])
+        except (RedisError, OSError) as e:
+            print(f"Subscription to {channel} failed: {e!r}, subscribing again in {delay:.1f} s")
+
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, PUBSUB_RECONNECT_MAX_DELAY)
+
+
+async def _forward_readings(data: str):
+    try:
+        broadcaster.publish(data_responses_adapter.validate_json(data))
+    except ValidationError as e:
+        print(str(e))
+
+
+async def _forward_published_readings():
+    # one subscription per process; every worker receives the readings ingested by any of them
+    await _consume_channel(READINGS_CHANNEL, _forward_readings)
+
+
+async def _send_alert_email(subject: str, message: str):
+    response = await http_client.post(
+        f"{os.getenv("EMAIL_SERVICE_ADDRESS")}:{os.getenv("EMAIL_PORT")}/send_email",
+        json=EmailRequest(recipient=ALERT_EMAIL_RECIPIENT, subject=subject, message=message).model_dump(),
+    )
+    response.raise_for_status()
+
+
+async def _evaluate_alerts():
+    """
+    Runs in the worker holding alerts_lease: evaluates the rules on the readings ingested by all workers,
+    stores the alerts and emails them. The state of the rules starts over with every lease.
+    """
+    rule_engine = RuleEngine(
+        alert_rules,
+        alpha=float(os.getenv("ALERT_EW_ALPHA", 0.05)),
+        warmup=int(os.getenv("ALERT_WARMUP", 30)),
+    )
+    alert_notifier = AlertNotifier(
+        send=_send_alert_email,
+        interval=float(os.getenv("ALERT_EMAIL_INTERVAL", 300)),
+    )
+
+    async def evaluate(data: str):
+        try:
+            entries = data_responses_adapter.validate_json(data)
+        except ValidationError as e:
+            print(str(e))
+            return
+
+        # batches of different workers may interleave, the engine skips readings older than the last one seen
+        alerts = rule_engine.evaluate_batch(entries)
+        if alerts:
+            await _store_alerts(alerts)
+            if ALERT_EMAIL_RECIPIENT:
+                alert_notifier.add(alerts)
+
+    # alerts are only emailed when someone is there to receive them
+    notifier = asyncio.create_task(alert_notifier.run()) if ALERT_EMAIL_RECIPIENT else None
+    try:
+        await _consume_channel(INGESTED_CHANNEL, evaluate)
+    finally:
+        if notifier is not None:
+            notifier.cancel()
+            await asyncio.gather(notifier, return_exceptions=True)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    await _bootstrap()
+    listener = asyncio.create_task(_forward_published_readings())
+    ingestion_worker = asyncio.create_task(ingestion_queue.run())
+    alerting = asyncio.create_task(alerts_lease.hold(_evaluate_alerts)) if ALERTS_ENABLED else None
+    yield
+    listener.cancel()
+    ingestion_worker.cancel()
+    await asyncio.gather(listener, ingestion_worker, return_exceptions=True)
+    if alerting is not None:
+        alerting.cancel()
+        await asyncio.gather(alerting, return_exceptions=True)
+    await http_client.aclose()
+    await redis_client.aclose()
+    await redis_pool.disconnect()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+async def _fetch_historical_data(hist_data_req: HistDataRequest) -> List[DataResponse]:
+    response = await http_client.get(
+        os.getenv("HIST_SENSOR_DATA"),
+        params={
+            "device_id": hist_data_req.device_id,
+            "sensor_type": hist_data_req.sensor_type,
+            "location": hist_data_req.location,
+            "from": hist_data_req.from_date,
+            "to": hist_data_req.to_date,
+        }
+    )
+    response.raise_for_status()
+
+    data = response.json()
+    return data_responses_adapter.validate_python(data) if data else []
 
 
 @app.get("/historical_data")
 async def get_historical_data(
-    hist_data_req: HistDataRequest = Depends()
+    hist_data_req: HistDataRequest = Depends(),
+    resolution: Optional[str] = Query(None, description="Bucket width, e.g. 5min, 1h"),
+    max_points: Optional[int] = Query(None, ge=3, description="Maximum number of points per series"),
+    downsampling: DownsamplingMethod = Query(DownsamplingMethod.LTTB, description="lttb, mean, minmax"),
+    response_format: ResponseFormat = Query(ResponseFormat.OBJECTS, description="objects, columnar, arrow"),
 ) -> List[DataResponse]:
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            os.getenv("HIST_SENSOR_DATA"),
-            params={
-                "device_id": hist_data_req.device_id,
-                "sensor_type": hist_data_req.sensor_type,
-                "location": hist_data_req.location,
-                "from": hist_data_req.from_date,
-                "to": hist_data_req.to_date,
-            }
-        )
-        response.raise_for_status()
-        return [DataResponse.model_validate(res) for res in response.json()] if response.json() else []
+    resolution_ns = None
+    if resolution is not None:
+        try:
+            resolution_ns = pd.Timedelta(resolution).value
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid resolution: {resolution}")
+
+        if resolution_ns <= 0:
+            raise HTTPException(status_code=400, detail="Resolution must be positive")
+
+    data = await hist_cache.get_or_fetch(hist_data_req, lambda: _fetch_historical_data(hist_data_req))
+
+    data = downsample(data, downsampling, resolution_ns, max_points)
+
+    if response_format != ResponseFormat.OBJECTS:
+        return columnar_response(data, response_format)
+
+    return data
 
 
 @app.post("/webhook")
-async def receive_webhook(request: Request, background_tasks: BackgroundTasks):
+async def receive_webhook(request: Request):
     data = await request.json()
-    background_tasks.add_task(update_real_time_data, data)
+
+    if not ingestion_queue.put(data if isinstance(data, list) else [data]):
+        raise HTTPException(status_code=503, detail="Ingestion queue is full", headers={"Retry-After": "1"})
+
     return {"status": "received"}
 
 
-def update_real_time_data(data: List[Dict]):
-    for entry in data:
-        try:
-            new_entry = DataResponse.model_validate(entry)
-        except Exception as e:
-            print(str(e))
-            continue
+def _validate_batch(data: List[Dict]) -> List[DataResponse]:
+    try:
+        return data_responses_adapter.validate_python(data)
+    except ValidationError as e:
+        print(str(e))
+
+        # drop only the malformed entries instead of the whole batch
+        invalid_entries = {error["loc"][0] for error in e.errors() if error["loc"]}
+        if not invalid_entries or not isinstance(data, list):
+            return []
+
+        return data_responses_adapter.validate_python(
+            [entry for i, entry in enumerate(data) if i not in invalid_entries]
+        )
+
+
+async def _store_readings(entries: List[DataResponse]) -> int:
+    latest_entries = {}
+    series_entries = {}
+    for entry in entries:
+        key = reading_key(entry.device_id, entry.sensor_type, entry.location)
+
+        encoded_entry = encode_reading(entry)
+        series_entries.setdefault(key, {})[encoded_entry] = entry.timestamp.timestamp()
+
+        if key not in latest_entries or latest_entries[key][0].timestamp <= entry.timestamp:
+            latest_entries[key] = (entry, encoded_entry)
+
+    if not latest_entries:
+        return 0
+
+    indexed_keys = {}
+    floor_locations = {}
+    location_sensors = {}
+    for key, (entry, _) in latest_entries.items():
+        for index_key in index_keys(entry.device_id, entry.sensor_type, entry.location):
+            indexed_keys.setdefault(index_key, []).append(key)
+
+        floor_locations.setdefault(entry.floor, set()).add(entry.location)
+        if entry.sensor_type != "motion":
+            location_sensors.setdefault(entry.location, set()).add(entry.sensor_type)
+
+    series_cutoff = time.time() - RECENT_DATA_RETENTION
 
-        key = KEY_DELIM.join((new_entry.device_id, new_entry.sensor_type, new_entry.location))
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.mset({key: encoded_entry for key, (_, encoded_entry) in latest_entries.items()})
+    for key, scored_entries in series_entries.items():
+        pipe.zadd(series_key(key), scored_entries)
+        pipe.zremrangebyscore(series_key(key), "-inf", f"({series_cutoff}")
+        # series of sensors that stop reporting disappear on their own
+        pipe.expire(series_key(key), RECENT_DATA_RETENTION)
+    for index_key, keys in indexed_keys.items():
+        pipe.sadd(index_key, *keys)
+    pipe.sadd(FLOORS_KEY, *floor_locations)
+    for floor, locations in floor_locations.items():
+        pipe.sadd(floor_locations_key(floor), *locations)
+    for location, sensor_types in location_sensors.items():
+        pipe.sadd(location_sensors_key(location), *sensor_types)
+    pipe.publish(READINGS_CHANNEL, data_responses_adapter.dump_json([entry for entry, _ in latest_entries.values()]))
+    if ALERTS_ENABLED:
+        pipe.publish(INGESTED_CHANNEL, data_responses_adapter.dump_json(entries))
+    await pipe.execute()
 
-        redis_client.set(key, new_entry.model_dump_json())
+    return len(latest_entries)
 
-        if new_entry.location not in available_sensors:
-            available_sensors[new_entry.location] = set()
 
-        if new_entry.sensor_type != "motion":
-            available_sensors[new_entry.location].add(new_entry.sensor_type)
+async def _store_alerts(alerts: List[Alert]):
+    encoded_alerts = [alert.model_dump_json() for alert in alerts]
 
-        if new_entry.floor not in building_plan:
-            building_plan[new_entry.floor] = set()
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.lpush(ALERTS_KEY, *encoded_alerts)
+    pipe.ltrim(ALERTS_KEY, 0, ALERT_HISTORY_SIZE - 1)
+    for encoded_alert in encoded_alerts:
+        pipe.publish(ALERTS_CHANNEL, encoded_alert)
+    await pipe.execute()
 
-        building_plan[new_entry.floor].add(new_entry.location)
+
+async def update_real_time_data(data: List[Dict]):
+    start_time = time.perf_counter()
+
+    new_entries = _validate_batch(data)
+    validated_time = time.perf_counter()
+
+    written_keys = await _store_readings(new_entries)
+    end_time = time.perf_counter()
+
+    print(f"Ingested batch: {len(data)} received, {len(new_entries)} valid, {written_keys} keys written "
+          f"(validation {(validated_time - start_time) * 1000:.2f} ms, "
+          f"write {(end_time - validated_time) * 1000:.2f} ms)")
 
 
 @app.get("/real_time_data")
 async def get_real_time_data(
-    real_time_req: RealTimeDataRequest = Depends()
+    real_time_req: RealTimeDataRequest = Depends(),
+    response_format: ResponseFormat = Query(ResponseFormat.OBJECTS, description="objects, columnar, arrow"),
 ) -> Dict[Tuple[str, str, str], DataResponse]:
     filtered_data = {}
 
-    keys = redis_client.keys("*")
-    for key in keys:
-        key_parts = key.split(KEY_DELIM)
+    keys = list(await redis_client.sinter(query_index_keys(
+        device_id=real_time_req.device_id,
+        sensor_type=real_time_req.sensor_type,
+        location=real_time_req.location,
+    )))
+
+    for key, raw_data in zip(keys, await redis_client.mget(keys) if keys else []):
+        # the reading may have been evicted while its index entry survived
+        if raw_data is None:
+            continue
+
+        filtered_data[split_reading_key(key)] = decode_reading(raw_data)
 
-        if (real_time_req.device_id is None or real_time_req.device_id == key_parts[0]) \
-            and (real_time_req.sensor_type is None or real_time_req.sensor_type == key_parts[1]) \
-                and (real_time_req.location is None or real_time_req.location == key_parts[2]):
-            data = eval(redis_client.get(key))
-            filtered_data[(key_parts[0], key_parts[1], key_parts[2])] = DataResponse.model_validate(data)
+    if response_format != ResponseFormat.OBJECTS:
+        return columnar_response(filtered_data.values(), response_format)
 
     return filtered_data
 
 
+@app.get("/recent_data")
+async def get_recent_data(
+    real_time_req: RealTimeDataRequest = Depends(),
+    minutes: int = Query(15, gt=0, description="How far back to go, at most RECENT_DATA_RETENTION"),
+    response_format: ResponseFormat = Query(ResponseFormat.OBJECTS, description="objects, columnar, arrow"),
+) -> List[DataResponse]:
+    keys = await redis_client.sinter(query_index_keys(
+        device_id=real_time_req.device_id,
+        sensor_type=real_time_req.sensor_type,
+        location=real_time_req.location,
+    ))
+
+    cutoff = time.time() - minutes * 60
+
+    pipe = redis_client.pipeline(transaction=False)
+    for key in keys:
+        pipe.zrangebyscore(series_key(key), cutoff, "+inf")
+
+    recent_data = [decode_reading(raw_data) for series in await pipe.execute() for raw_data in series]
+    recent_data.sort(key=lambda entry: entry.timestamp)
+
+    if response_format != ResponseFormat.OBJECTS:
+        return columnar_response(recent_data, response_format)
+
+    return recent_data
+
+
+@app.get("/stream")
+async def stream_real_time_data(
+    real_time_req: RealTimeDataRequest = Depends()
+) -> StreamingResponse:
+    subscriber = broadcaster.subscribe(real_time_req)
+
+    async def event_stream():
+        try:
+            while True:
+                try:
+                    entry = await asyncio.wait_for(subscriber.queue.get(), timeout=STREAM_KEEPALIVE)
+                except TimeoutError:
+                    # SSE comment, keeps proxies from closing an idle connection
+                    yield ": keep-alive\n\n"
+                    continue
+
+                yield f"data: {entry.model_dump_json()}\n\n"
+        finally:
+            broadcaster.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/alerts")
+async def get_alerts(
+    limit: int = Query(50, gt=0, description="Number of alerts, most recent first"),
+    location: Optional[str] = None,
+) -> List[Alert]:
+    alerts = [Alert.model_validate_json(raw_alert) for raw_alert in await redis_client.lrange(ALERTS_KEY, 0, -1)]
+
+    if location is not None:
+        alerts = [alert for alert in alerts if alert.location == location]
+
+    return alerts[:limit]
+
+
 @app.get("/get_building_plan")
 async def get_building_plan() -> Dict[int, set[str]]:
-    return building_plan
+    floors = sorted(int(floor) for floor in await redis_client.smembers(FLOORS_KEY))
+
+    pipe = redis_client.pipeline(transaction=False)
+    for floor in floors:
+        pipe.smembers(floor_locations_key(floor))
+
+    return dict(zip(floors, await pipe.execute()))
 
 
 @app.get("/available_sensors")
 async def get_available_sensors(location: str) -> list[str]:
-    return list(available_sensors[location])
+    return list(await redis_client.smembers(location_sensors_key(location)))
 
 
-def init_construct(init_data: list[DataResponse]):
-    global available_sensors
-    global building_plan
+async def init_construct(init_data: list[DataResponse]):
+    start_time = time.perf_counter()
 
-    for data_response in init_data:
-        key = KEY_DELIM.join((data_response.device_id, data_response.sensor_type, data_response.location))
-        redis_client.set(key, data_response.model_dump_json())
+    written_keys = await _store_readings(init_data)
 
-        if data_response.location not in available_sensors:
-            available_sensors[data_response.location] = set()
+    print(f"Initial construct: {len(init_data)} readings, {written_keys} keys written "
+          f"in {(time.perf_counter() - start_time) * 1000:.2f} ms")
 
-        if data_response.sensor_type != "motion":
-            available_sensors[data_response.location].add(data_response.sensor_type)
 
-        if data_response.floor not in building_plan:
-            building_plan[data_response.floor] = set()
-
-        building_plan[data_response.floor].add(data_response.location)
+@app.get("/metrics")
+async def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
 
 if __name__ == "__main__":
@@ -134,9 +532,4 @@ if __name__ == "__main__":
             },
         )
 
-    with httpx.Client() as client:
-        response = client.get(os.getenv("HIST_SENSOR_DATA"))
-        parsed_sensor_data = [DataResponse.model_validate(res) for res in response.json()] if response.json() else []
-        init_construct(parsed_sensor_data)
-
     uvicorn.run(app, host=os.getenv("HOST"), port=int(os.getenv("PORT")))
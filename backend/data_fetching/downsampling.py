@@ -0,0 +1,131 @@
+from datetime import datetime, timezone
+from typing import List, Optional
+
+import numpy as np
+
+from backend.data_fetching.web_model import DownsamplingMethod
+from backend.shared_models.sensor_data_model import DataResponse
+from backend.utils.real_time_store import reading_key
+
+
+def _bucket_bounds(buckets: np.ndarray) -> np.ndarray:
+    """
+    Start index of every run of equal bucket ids (the ids are non-decreasing).
+    """
+    return np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+
+
+def _bucket_means(series: List[DataResponse], values: np.ndarray, buckets: np.ndarray,
+                  bucket_width: int, origin: int) -> List[DataResponse]:
+    starts = _bucket_bounds(buckets)
+    means = np.add.reduceat(values, starts) / np.diff(np.append(starts, len(values)))
+    bucket_timestamps = [datetime.fromtimestamp(bucket_start / 1e9, tz=timezone.utc)
+                         for bucket_start in (origin + buckets[starts] * bucket_width).tolist()]
+
+    return [
+        series[start].model_copy(update={"value": float(mean), "timestamp": timestamp})
+        for start, mean, timestamp in zip(starts, means, bucket_timestamps)
+    ]
+
+
+def _bucket_min_max(series: List[DataResponse], values: np.ndarray, buckets: np.ndarray) -> List[DataResponse]:
+    starts = _bucket_bounds(buckets)
+    ends = np.append(starts[1:], len(values))
+
+    selected = set()
+    for start, end in zip(starts, ends):
+        bucket = values[start:end]
+        selected.add(start + int(np.argmin(bucket)))
+        selected.add(start + int(np.argmax(bucket)))
+
+    return [series[i] for i in sorted(selected)]
+
+
+def _lttb(series: List[DataResponse], timestamps: np.ndarray, values: np.ndarray,
+          max_points: int) -> List[DataResponse]:
+    """
+    Largest-Triangle-Three-Buckets: keeps, from every bucket, the point forming the largest triangle
+    with the point kept from the previous bucket and the mean of the next one, which preserves the
+    visual shape of the series.
+    """
+    n = len(values)
+    x = (timestamps - timestamps[0]).astype(np.float64)
+
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    selected = [0]
+
+    for i in range(max_points - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+
+        next_x = x[end:next_end].mean() if next_end > end else x[n - 1]
+        next_y = values[end:next_end].mean() if next_end > end else values[n - 1]
+
+        prev = selected[-1]
+        areas = np.abs((x[prev] - next_x) * (values[start:end] - values[prev])
+                       - (x[prev] - x[start:end]) * (next_y - values[prev]))
+        selected.append(start + int(np.argmax(areas)))
+
+    selected.append(n - 1)
+    return [series[i] for i in selected]
+
+
+def _downsample_series(series: List[DataResponse], method: DownsamplingMethod,
+                       resolution: Optional[int], max_points: Optional[int]) -> List[DataResponse]:
+    timestamps = np.array([entry.timestamp.timestamp() * 1e9 for entry in series], dtype=np.int64)
+    values = np.array([entry.value for entry in series], dtype=np.float64)
+
+    if resolution is not None:
+        origin = int(timestamps[0] // resolution * resolution)
+        buckets = (timestamps - origin) // resolution
+        if method == DownsamplingMethod.MINMAX:
+            series = _bucket_min_max(series, values, buckets)
+        else:
+            series = _bucket_means(series, values, buckets, resolution, origin)
+
+        if max_points is None or len(series) <= max_points:
+            return series
+
+        timestamps = np.array([entry.timestamp.timestamp() * 1e9 for entry in series], dtype=np.int64)
+        values = np.array([entry.value for entry in series], dtype=np.float64)
+
+    if max_points is None or len(series) <= max_points:
+        return series
+
+    if method == DownsamplingMethod.LTTB:
+        return _lttb(series, timestamps, values, max(max_points, 3))
+
+    # equal-width time buckets; min/max keeps two points per bucket
+    n_buckets = max(1, max_points // 2 if method == DownsamplingMethod.MINMAX else max_points)
+    bucket_width = max(1, -(-int(timestamps[-1] - timestamps[0] + 1) // n_buckets))
+    buckets = (timestamps - timestamps[0]) // bucket_width
+
+    if method == DownsamplingMethod.MINMAX:
+        return _bucket_min_max(series, values, buckets)
+
+    return _bucket_means(series, values, buckets, bucket_width, int(timestamps[0]))
+
+
+def downsample(data: List[DataResponse],
+               method: DownsamplingMethod = DownsamplingMethod.LTTB,
+               resolution: Optional[int] = None,
+               max_points: Optional[int] = None) -> List[DataResponse]:
+    """
+    Downsamples every (device, sensor type, location) series independently.
+
+    `resolution` (in nanoseconds) first aggregates the series into fixed time buckets, then `max_points`
+    caps the number of points returned per series.
+    """
+    if resolution is None and max_points is None:
+        return data
+
+    all_series = {}
+    for entry in data:
+        all_series.setdefault(reading_key(entry.device_id, entry.sensor_type, entry.location), []).append(entry)
+
+    downsampled = []
+    for series in all_series.values():
+        series.sort(key=lambda entry: entry.timestamp)
+        downsampled.extend(_downsample_series(series, method, resolution, max_points))
+
+    return downsampled
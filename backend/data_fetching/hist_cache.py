@@ -0,0 +1,132 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone, timedelta
+from typing import Awaitable, Callable, List, Optional
+
+from backend.shared_models.sensor_data_model import DataResponse, HistDataRequest
+from backend.utils.sensor_codec import data_responses_adapter
+
+
+def _parse_rfc3339(value: Optional[str]) -> Optional[datetime]:
+    if value is None:
+        return None
+
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        # left for the upstream API to reject
+        return None
+
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def cache_key(hist_data_req: HistDataRequest) -> str:
+    """
+    Requests that differ only in the spelling of their dates (offsets, 'Z' vs '+00:00') share the same key.
+    """
+    params = hist_data_req.model_dump(exclude_none=True)
+
+    for field in ("from_date", "to_date"):
+        parsed = _parse_rfc3339(params.get(field))
+        if parsed is not None:
+            params[field] = parsed.astimezone(timezone.utc).isoformat()
+
+    return json.dumps(params, sort_keys=True)
+
+
+class HistoricalDataCache:
+    """
+    Read-through cache for upstream historical data, with an in-memory LRU and an optional Redis layer.
+
+    Windows that ended more than `closed_window_grace` ago can no longer change and are kept for
+    `closed_window_ttl`; open windows only for `open_window_ttl`. Concurrent misses on the same key
+    share a single upstream call.
+    """
+
+    def __init__(self,
+                 max_entries: int,
+                 open_window_ttl: float,
+                 closed_window_ttl: float,
+                 closed_window_grace: float = 60,
+                 redis_client=None,
+                 redis_prefix: str = "hist_cache"):
+        self.max_entries = max_entries
+        self.open_window_ttl = open_window_ttl
+        self.closed_window_ttl = closed_window_ttl
+        self.closed_window_grace = timedelta(seconds=closed_window_grace)
+        self.redis_client = redis_client
+        self.redis_prefix = redis_prefix
+
+        self._entries: OrderedDict[str, tuple[float, List[DataResponse]]] = OrderedDict()
+        self._in_flight: dict[str, asyncio.Task] = {}
+
+    def ttl(self, hist_data_req: HistDataRequest) -> float:
+        to_date = _parse_rfc3339(hist_data_req.to_date)
+
+        if to_date is not None and to_date < datetime.now(timezone.utc) - self.closed_window_grace:
+            return self.closed_window_ttl
+
+        return self.open_window_ttl
+
+    async def get_or_fetch(
+        self,
+        hist_data_req: HistDataRequest,
+        fetch: Callable[[], Awaitable[List[DataResponse]]]
+    ) -> List[DataResponse]:
+        key = cache_key(hist_data_req)
+
+        cached = self._get_local(key)
+        if cached is not None:
+            return cached
+
+        # the upstream call runs in its own task, so a disconnecting client does not cancel it for the others
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key, hist_data_req, fetch))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+
+        return await asyncio.shield(task)
+
+    async def _load(self, key, hist_data_req, fetch) -> List[DataResponse]:
+        data = await self._fetch_through_redis(key, hist_data_req, fetch)
+        self._set_local(key, data, self.ttl(hist_data_req))
+        return data
+
+    async def _fetch_through_redis(self, key, hist_data_req, fetch) -> List[DataResponse]:
+        if self.redis_client is None:
+            return await fetch()
+
+        redis_key = f"{self.redis_prefix}|{key}"
+
+        raw_data = await self.redis_client.get(redis_key)
+        if raw_data is not None:
+            return data_responses_adapter.validate_json(raw_data)
+
+        data = await fetch()
+        await self.redis_client.set(redis_key,
+                                    data_responses_adapter.dump_json(data),
+                                    ex=max(1, int(self.ttl(hist_data_req))))
+        return data
+
+    def _get_local(self, key: str) -> Optional[List[DataResponse]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, data = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return data
+
+    def _set_local(self, key: str, data: List[DataResponse], ttl: float):
+        self._entries[key] = (time.monotonic() + ttl, data)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -0,0 +1,115 @@
+import asyncio
+import time
+from collections import deque
+from enum import Enum
+from typing import Awaitable, Callable, Dict, List
+
+from prometheus_client import Counter, Gauge, Histogram
+
+QUEUE_DEPTH = Gauge('ingestion_queue_depth', 'Readings waiting in the ingestion queue')
+QUEUE_LAG = Histogram('ingestion_lag_seconds', 'Time readings spent in the ingestion queue before being flushed')
+DROPPED_READINGS = Counter('ingestion_dropped_readings', 'Readings dropped because the ingestion queue was full',
+                           ['reason'])
+FLUSHED_READINGS = Counter('ingestion_flushed_readings', 'Readings handed to the batch writer')
+FLUSH_DURATION = Histogram('ingestion_flush_seconds', 'Duration of one batch flush')
+
+
+class OverflowPolicy(str, Enum):
+    REJECT = "reject"
+    DROP_OLDEST = "drop_oldest"
+
+
+class IngestionQueue:
+    """
+    Bounded buffer between /webhook and the Redis writer.
+
+    A single consumer flushes up to `batch_size` readings at a time, as soon as a full batch is available
+    or `flush_interval` seconds after the oldest queued reading arrived. When the queue is full, REJECT
+    refuses the whole payload (the webhook answers 503 and the sender retries), DROP_OLDEST evicts the
+    oldest queued readings, since newer readings supersede them anyway.
+    """
+
+    def __init__(self,
+                 flush: Callable[[List[Dict]], Awaitable[None]],
+                 max_size: int,
+                 batch_size: int,
+                 flush_interval: float,
+                 policy: OverflowPolicy = OverflowPolicy.REJECT):
+        self.flush = flush
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+
+        self._readings: deque[tuple[float, Dict]] = deque()
+        self._changed = asyncio.Event()
+
+    def __len__(self):
+        return len(self._readings)
+
+    def put(self, entries: List[Dict]) -> bool:
+        overflow = len(self._readings) + len(entries) - self.max_size
+
+        if overflow > 0:
+            if self.policy == OverflowPolicy.REJECT:
+                DROPPED_READINGS.labels(reason="rejected").inc(len(entries))
+                return False
+
+            if len(entries) > self.max_size:
+                entries = entries[-self.max_size:]
+            for _ in range(min(overflow, len(self._readings))):
+                self._readings.popleft()
+            DROPPED_READINGS.labels(reason="evicted").inc(overflow)
+
+        now = time.monotonic()
+        self._readings.extend((now, entry) for entry in entries)
+
+        QUEUE_DEPTH.set(len(self._readings))
+        self._changed.set()
+        return True
+
+    async def run(self):
+        try:
+            while True:
+                await self._wait_for_batch()
+                await self._flush_batch()
+        finally:
+            # flush what is left on shutdown
+            while self._readings:
+                await self._flush_batch()
+
+    async def _wait_for_batch(self):
+        while not self._readings:
+            self._changed.clear()
+            await self._changed.wait()
+
+        deadline = self._readings[0][0] + self.flush_interval
+
+        while len(self._readings) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=remaining)
+            except TimeoutError:
+                return
+
+    async def _flush_batch(self):
+        now = time.monotonic()
+        batch = []
+
+        while self._readings and len(batch) < self.batch_size:
+            enqueued_at, entry = self._readings.popleft()
+            QUEUE_LAG.observe(now - enqueued_at)
+            batch.append(entry)
+
+        QUEUE_DEPTH.set(len(self._readings))
+        FLUSHED_READINGS.inc(len(batch))
+
+        with FLUSH_DURATION.time():
+            try:
+                await self.flush(batch)
+            except Exception as e:
+                print(f"Failed to flush ingestion batch of {len(batch)} readings: {e}")
@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+class DownsamplingMethod(str, Enum):
+    LTTB = "lttb"
+    MEAN = "mean"
+    MINMAX = "minmax"
@@ -0,0 +1,287 @@
+import re
+
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException
+
+from backend.historical_data.web_models import AggrPeriod, AggregationMethod
+
+PERIOD_RULES = {
+    AggrPeriod.DAILY: "D",
+    AggrPeriod.WEEKLY: "W",
+    AggrPeriod.SEASONAL: "QE",
+}
+
+# methods that can be derived from the count, sum, sum of squares, min and max of every day
+ROLLUP_METHODS = (
+    AggregationMethod.MEAN,
+    AggregationMethod.MIN,
+    AggregationMethod.MAX,
+    AggregationMethod.STD,
+    AggregationMethod.COUNT,
+    AggregationMethod.SUM,
+    AggregationMethod.ROLLING_MEAN,
+)
+
+ROLLUP_COLUMNS = ["count", "sum", "sum_sq", "min", "max"]
+
+_ROLLUP_TOTALS = {"count": "sum", "sum": "sum", "sum_sq": "sum", "min": "min", "max": "max"}
+
+# one report per (location, sensor type) in the batch reports
+GROUP_KEYS = ["location", "sensor_type"]
+
+# p95, p99.9, ...
+_PERCENTILE = re.compile(r"p(\d{1,2}(?:\.\d+)?|100)")
+
+ROLLING_WINDOW = 3
+
+
+def parse_aggregation_methods(aggregation_method: str) -> list[str]:
+    """
+    Splits a comma separated list of aggregation methods (`mean,min,max,p95`) and validates every item.
+    """
+    methods = []
+
+    for method in aggregation_method.split(","):
+        method = method.strip().lower()
+
+        if method not in AggregationMethod._value2member_map_ and not _PERCENTILE.fullmatch(method):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid aggregation method '{method}', expected one of: "
+                       f"{', '.join(m.value for m in AggregationMethod)} or a percentile such as p95"
+            )
+
+        if method not in methods:
+            methods.append(method)
+
+    return methods
+
+
+def _rolling_mean(means) -> np.ndarray:
+    return pd.Series(means).rolling(window=ROLLING_WINDOW, min_periods=1).mean().to_numpy()
+
+
+def _report(columns: dict, index: pd.DatetimeIndex, methods: list[str]) -> pd.DataFrame:
+    report = pd.DataFrame({method: columns[method] for method in methods}, index=index)
+    report = report.fillna(0)
+    report.index.name = "timestamp"
+
+    if len(methods) == 1:
+        # a single aggregation keeps the original `timestamp, value` layout
+        report.columns = ["value"]
+
+    return report.reset_index()
+
+
+def _percentile_of(method: str) -> float:
+    return 50.0 if method == AggregationMethod.MEDIAN else float(method[1:])
+
+
+class _Periods:
+    """
+    The readings of a sorted series split into one contiguous segment per period. Every statistic
+    is a numpy reduction over the same segments, so the series is binned only once.
+    """
+
+    def __init__(self, values: pd.Series, rule: str):
+        # the resampler only provides the period labels and the number of readings in each of them
+        counts = values.resample(rule).count()
+
+        self.index = counts.index
+        self.counts = counts.to_numpy()
+        self.values = values.to_numpy(dtype=np.float64)
+
+        ends = np.cumsum(self.counts)
+        self.filled = self.counts > 0
+        # reduceat needs strictly increasing offsets, so the empty periods are left out and stay NaN
+        self.starts = (ends - self.counts)[self.filled]
+        self.ends = ends[self.filled]
+
+    def _result(self, filled_values) -> np.ndarray:
+        result = np.full(len(self.counts), np.nan)
+        result[self.filled] = filled_values
+        return result
+
+    def count(self):
+        return self.counts.astype(np.float64)
+
+    def sum(self):
+        return self._result(np.add.reduceat(self.values, self.starts))
+
+    def sum_sq(self):
+        return self._result(np.add.reduceat(self.values * self.values, self.starts))
+
+    def mean(self):
+        return self._result(np.add.reduceat(self.values, self.starts) / self.counts[self.filled])
+
+    def min(self):
+        return self._result(np.minimum.reduceat(self.values, self.starts))
+
+    def max(self):
+        return self._result(np.maximum.reduceat(self.values, self.starts))
+
+    def first(self):
+        return self._result(self.values[self.starts])
+
+    def last(self):
+        return self._result(self.values[self.ends - 1])
+
+    def std(self):
+        counts = self.counts[self.filled]
+        means = np.add.reduceat(self.values, self.starts) / counts
+        deviations = self.values - np.repeat(means, counts)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            variances = np.add.reduceat(deviations * deviations, self.starts) / (counts - 1)
+        # sample standard deviation, undefined for a single reading (as in pandas)
+        return self._result(np.where(counts > 1, np.sqrt(variances), np.nan))
+
+    def rolling_mean(self):
+        return _rolling_mean(self.mean())
+
+    def percentiles(self, percentiles: list[float]) -> np.ndarray:
+        """
+        All the requested percentiles of every period, one row per percentile. The readings of
+        a period are partitioned once for all of them.
+        """
+        result = np.full((len(percentiles), len(self.counts)), np.nan)
+
+        for position, start, end in zip(np.flatnonzero(self.filled), self.starts, self.ends):
+            result[:, position] = np.percentile(self.values[start:end], percentiles)
+
+        return result
+
+
+def _sorted_values(values: pd.Series) -> pd.Series:
+    values = values.dropna()
+    if not values.index.is_monotonic_increasing:
+        values = values.sort_index()
+
+    return values
+
+
+def aggregate(values: pd.Series, period: AggrPeriod, methods: list[str]) -> pd.DataFrame:
+    """
+    Aggregates a timestamp indexed series into one row per period and one column per method.
+    Empty periods are filled with 0.
+    """
+    periods = _Periods(_sorted_values(values), PERIOD_RULES[period])
+    columns = {}
+
+    percentile_methods = [method for method in methods
+                          if method == AggregationMethod.MEDIAN or _PERCENTILE.fullmatch(method)]
+    if percentile_methods:
+        rows = periods.percentiles([_percentile_of(method) for method in percentile_methods])
+        columns.update(zip(percentile_methods, rows))
+
+    for method in methods:
+        if method not in columns:
+            columns[method] = getattr(periods, method)()
+
+    return _report(columns, periods.index, methods)
+
+
+def daily_rollups(values: pd.Series) -> pd.DataFrame:
+    """
+    Count, sum, sum of squares, min and max of every day that has readings.
+    """
+    periods = _Periods(_sorted_values(values), "D")
+    rollups = pd.DataFrame({column: getattr(periods, column)() for column in ROLLUP_COLUMNS}, index=periods.index)
+
+    return rollups[periods.filled]
+
+
+def _rollup_columns(totals: pd.DataFrame) -> dict:
+    count = totals["count"].to_numpy(dtype=np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = totals["sum"].to_numpy() / count
+        variance = (totals["sum_sq"].to_numpy() - count * mean * mean) / (count - 1)
+
+    return {
+        AggregationMethod.COUNT: count,
+        AggregationMethod.SUM: np.where(count > 0, totals["sum"].to_numpy(), np.nan),
+        AggregationMethod.MEAN: mean,
+        AggregationMethod.MIN: totals["min"].to_numpy(),
+        AggregationMethod.MAX: totals["max"].to_numpy(),
+        # sums of squares lose a little precision, so a constant series may end up slightly below 0
+        AggregationMethod.STD: np.where(count > 1, np.sqrt(np.maximum(variance, 0)), np.nan),
+    }
+
+
+def aggregate_rollups(daily: pd.DataFrame, period: AggrPeriod, methods: list[str]) -> pd.DataFrame:
+    """
+    Same report as `aggregate`, computed from the daily rollups instead of the raw readings.
+    """
+    totals = daily.resample(PERIOD_RULES[period]).agg(_ROLLUP_TOTALS)
+
+    columns = _rollup_columns(totals)
+    columns[AggregationMethod.ROLLING_MEAN] = _rolling_mean(columns[AggregationMethod.MEAN])
+
+    return _report({method: columns[AggregationMethod(method)] for method in methods}, totals.index, methods)
+
+
+def _group_periods(observed: pd.MultiIndex, rule: str) -> pd.MultiIndex:
+    """
+    Every period between the first and the last observed one of each group, including the empty ones.
+    """
+    bounds = observed.to_frame(index=False).groupby(GROUP_KEYS)["timestamp"].agg(["min", "max"])
+
+    return pd.MultiIndex.from_tuples(
+        [(*group, label) for group, first, last in zip(bounds.index, bounds["min"], bounds["max"])
+         for label in pd.date_range(first, last, freq=rule)],
+        names=GROUP_KEYS + ["timestamp"],
+    )
+
+
+def _grouped_report(columns: dict, rule: str, methods: list[str]) -> pd.DataFrame:
+    # grouping by a time grouper only produces the periods that have readings
+    frame = pd.DataFrame(columns)
+    frame = frame.reindex(_group_periods(frame.index, rule))
+
+    if AggregationMethod.ROLLING_MEAN in methods:
+        frame[AggregationMethod.ROLLING_MEAN.value] = frame[AggregationMethod.MEAN.value] \
+            .groupby(level=GROUP_KEYS).rolling(window=ROLLING_WINDOW, min_periods=1).mean() \
+            .droplevel([0, 1])
+
+    report = frame[methods].fillna(0)
+
+    if len(methods) == 1:
+        report.columns = ["value"]
+
+    return report.reset_index()
+
+
+def _grouper(period: AggrPeriod):
+    return GROUP_KEYS + [pd.Grouper(key="timestamp", freq=PERIOD_RULES[period])]
+
+
+def aggregate_groups(readings: pd.DataFrame, period: AggrPeriod, methods: list[str]) -> pd.DataFrame:
+    """
+    `aggregate` for many series at once: `readings` has location, sensor_type, timestamp and value
+    columns and every method is a single grouped reduction over all of them.
+    """
+    grouped = readings.dropna(subset=["value"]).groupby(_grouper(period))["value"]
+    columns = {}
+
+    for method in methods + [AggregationMethod.MEAN.value]:
+        if method in columns or method == AggregationMethod.ROLLING_MEAN:
+            continue
+
+        if method == AggregationMethod.MEDIAN or _PERCENTILE.fullmatch(method):
+            columns[method] = grouped.quantile(_percentile_of(method) / 100)
+        else:
+            columns[method] = getattr(grouped, method)()
+
+    return _grouped_report(columns, PERIOD_RULES[period], methods)
+
+
+def aggregate_rollup_groups(daily: pd.DataFrame, period: AggrPeriod, methods: list[str]) -> pd.DataFrame:
+    """
+    `aggregate_rollups` for many series at once: `daily` has location, sensor_type and timestamp columns
+    next to the rollup columns.
+    """
+    totals = daily.groupby(_grouper(period)).agg(_ROLLUP_TOTALS)
+    columns = {method.value: pd.Series(values, index=totals.index)
+               for method, values in _rollup_columns(totals).items()}
+
+    return _grouped_report(columns, PERIOD_RULES[period], methods)
@@ -0,0 +1,36 @@
+import os
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, Column, Integer, String, Float, Date
+from sqlalchemy.orm import sessionmaker, declarative_base
+
+load_dotenv()
+
+engine = create_engine(os.getenv("DATABASE_URL", "sqlite:///historical_rollups.db"))
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+Base = declarative_base()
+
+
+class DailyRollup(Base):
+    __tablename__ = "DailyRollup"
+
+    location = Column(String, primary_key=True)
+    sensor_type = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    count = Column(Integer, nullable=False)
+    sum = Column(Float, nullable=False)
+    sum_sq = Column(Float, nullable=False)
+    min = Column(Float, nullable=False)
+    max = Column(Float, nullable=False)
+
+
+class RollupWatermark(Base):
+    __tablename__ = "RollupWatermark"
+
+    location = Column(String, primary_key=True)
+    sensor_type = Column(String, primary_key=True)
+    # first day that has not been rolled up yet
+    rolled_up_to = Column(Date, nullable=False)
+
+
+Base.metadata.create_all(bind=engine)
@@ -0,0 +1,145 @@
+import io
+from typing import AsyncIterator, Optional
+
+import pandas as pd
+from fastapi import HTTPException
+
+from backend.historical_data.web_models import DataFormat, Compression
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+MEDIA_TYPES = {
+    DataFormat.PARQUET: "application/vnd.apache.parquet",
+    DataFormat.ARROW: "application/vnd.apache.arrow.stream",
+}
+
+FILE_EXTENSIONS = {
+    DataFormat.PARQUET: "parquet",
+    DataFormat.ARROW: "arrow",
+}
+
+# Arrow IPC buffers can only be compressed with these codecs
+ARROW_COMPRESSIONS = (Compression.NONE, Compression.LZ4, Compression.ZSTD)
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Write-only file that hands its content out in chunks while keeping the absolute position,
+    which the Parquet writer needs for the offsets in the file footer.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def pop(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def check_format(data_format: DataFormat, compression: Compression):
+    if pa is None:
+        raise HTTPException(status_code=400,
+                            detail=f"The {data_format.value} format requires pyarrow to be installed")
+
+    if data_format == DataFormat.ARROW and compression not in ARROW_COMPRESSIONS:
+        raise HTTPException(status_code=400,
+                            detail=f"Arrow supports only {', '.join(c.value for c in ARROW_COMPRESSIONS)} compression")
+
+
+def _compression(compression: Compression) -> Optional[str]:
+    return None if compression == Compression.NONE else compression.value
+
+
+def _open_writer(sink, schema, data_format: DataFormat, compression: Compression):
+    if data_format == DataFormat.PARQUET:
+        return pq.ParquetWriter(sink, schema, compression=_compression(compression) or "none")
+
+    return pa.ipc.new_stream(sink, schema, options=pa.ipc.IpcWriteOptions(compression=_compression(compression)))
+
+
+def _sensor_field_type(field):
+    # numbers in the upstream JSON may be ints in one batch and floats in the next,
+    # timestamps arrive as RFC3339 strings
+    return {
+        "value": pa.float64(),
+        "latitude": pa.float64(),
+        "longitude": pa.float64(),
+        "floor": pa.int64(),
+        "timestamp": pa.timestamp("us", tz="UTC"),
+    }.get(field.name, field.type)
+
+
+def _rows_to_table(rows: list[dict], schema=None):
+    table = pa.Table.from_pylist(rows)
+
+    if schema is None:
+        schema = pa.schema([pa.field(field.name, _sensor_field_type(field)) for field in table.schema])
+
+    return table.select(schema.names).cast(schema)
+
+
+def encode_frame(df: pd.DataFrame, data_format: DataFormat, compression: Compression) -> bytes:
+    check_format(data_format, compression)
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = _ChunkSink()
+
+    with _open_writer(sink, table.schema, data_format, compression) as writer:
+        writer.write_table(table)
+
+    return sink.pop()
+
+
+async def stream_rows(rows: AsyncIterator[dict], data_format: DataFormat, compression: Compression,
+                      batch_size: int) -> AsyncIterator[bytes]:
+    """
+    Encodes rows as Parquet (one row group per batch) or as an Arrow IPC stream (one record batch per batch),
+    yielding the encoded bytes after every batch.
+    """
+    sink = _ChunkSink()
+    writer = None
+    schema = None
+    batch = []
+
+    def write_batch():
+        nonlocal writer, schema
+
+        table = _rows_to_table(batch, schema)
+        if writer is None:
+            schema = table.schema
+            writer = _open_writer(sink, schema, data_format, compression)
+        writer.write_table(table)
+
+    async for row in rows:
+        batch.append(row)
+
+        if len(batch) >= batch_size:
+            write_batch()
+            batch = []
+            yield sink.pop()
+
+    if batch:
+        write_batch()
+
+    if writer is not None:
+        writer.close()
+        yield sink.pop()
@@ -1,89 +1,183 @@
+import asyncio
+import csv
 import io
+import json
 import os
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone, timedelta
+from typing import AsyncIterator, List
 
 import httpx
+
 import pandas as pd
 import uvicorn
 from dotenv import load_dotenv
-from fastapi import FastAPI, Depends, HTTPException, Query
+from fastapi import FastAPI, Depends, HTTPException, Query, Response
 from fastapi.responses import StreamingResponse
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 
 from backend.shared_models.sensor_data_model import HistDataRequest
-from backend.historical_data.web_models import SensorType, DataFormat, AggrPeriod, AggregationMethod
+from backend.historical_data.aggregation import aggregate, aggregate_rollups, aggregate_groups, \
+    aggregate_rollup_groups, parse_aggregation_methods, GROUP_KEYS
+from backend.historical_data.database_model import SessionLocal
+from backend.historical_data.export_formats import encode_frame, check_format, stream_rows, MEDIA_TYPES, \
+    FILE_EXTENSIONS
+from backend.historical_data.rollups import RollupStore, can_use_rollups, readings_series
+from backend.historical_data.time_range import validate_range, split_range, format_date, clip_rows
+from backend.historical_data.web_models import SensorType, DataFormat, AggrPeriod, AggregationMethod, \
+    Compression
+from backend.utils.http_client import create_async_client
+from backend.utils.json_stream import iter_json_array
 
 load_dotenv()
 
-app = FastAPI()
+http_client = create_async_client()
 
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+REPORT_ROLLUPS = os.getenv("REPORT_ROLLUPS", "true").lower() == "true"
+# longer ranges are fetched as parallel sub-requests of at most this many days
+HIST_CHUNK_DAYS = float(os.getenv("HIST_CHUNK_DAYS", 7))
+# upstream requests in flight over all reports, chunks and batch pairs, never more than the connection pool
+HIST_UPSTREAM_CONCURRENCY = min(int(os.getenv("HIST_UPSTREAM_CONCURRENCY", 32)),
+                                int(os.getenv("HTTP_MAX_CONNECTIONS", 100)))
+upstream_semaphore = asyncio.Semaphore(HIST_UPSTREAM_CONCURRENCY)
 
-async def _get_data(
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    yield
+    await http_client.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+def _upstream_params(hist_data_request: HistDataRequest) -> dict:
+    # the sensor history API names the window bounds `from` and `to`
+    params = {
+        "device_id": hist_data_request.device_id,
+        "sensor_type": hist_data_request.sensor_type,
+        "location": hist_data_request.location,
+        "from": hist_data_request.from_date,
+        "to": hist_data_request.to_date,
+    }
+    return {name: value for name, value in params.items() if value is not None}
+
+
+async def _get_chunk(
     hist_data_request: HistDataRequest
 ):
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
+    async with upstream_semaphore:
+        response = await http_client.get(
             os.getenv("DATA_URL"),
-            params=hist_data_request.model_dump(exclude_none=True, exclude_unset=True, by_alias=True)
+            params=_upstream_params(hist_data_request)
         )
-        response.raise_for_status()
+    response.raise_for_status()
 
-        if response.status_code != 200:
-            raise HTTPException(status_code=response.status_code, detail="Failed to fetch data")
+    if response.status_code != 200:
+        raise HTTPException(status_code=response.status_code, detail="Failed to fetch data")
 
-    return response.json()
+    return response.json() or []
 
 
-@app.get("/historical_report")
-async def generate_report(
-    sensor: SensorType,
-    location: str,
-    period: AggrPeriod = AggrPeriod.DAILY,
-    aggregation_method: AggregationMethod = AggregationMethod.MEAN,
-    from_date: str = Query(None, description="RFC3339 format only (example: 2024-01-18T23:59:59Z"),
-    to_date: str = Query(None, description="RFC3339 format only (example: 2024-01-18T23:59:59Z"),
-    data_format: DataFormat = Query(DataFormat.JSON, description="Export format: json, csv"),
+async def _get_data(
+    hist_data_request: HistDataRequest
 ):
-    data = await _get_data(HistDataRequest(
-        sensor_type=sensor,
-        location=location,
-        # from=from_date,
-        to=to_date
-    ))
-
-    df = pd.DataFrame(data)
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-    df.set_index('timestamp', inplace=True)
-
-    df['value'] = pd.to_numeric(df['value'], errors='coerce')
-    df.dropna(subset=['value'], inplace=True)
-
-    if period == "daily":
-        report = df['value'].resample('D')
-    elif period == "weekly":
-        report = df['value'].resample('W')
-    elif period == "seasonal":
-        report = df['value'].resample('Q')
-    else:
-        raise HTTPException(status_code=400, detail="Invalid period specified")
-
-    if aggregation_method == AggregationMethod.MEAN:
-        report = report.mean().reset_index()
-    elif aggregation_method == AggregationMethod.MIN:
-        report = report.min().reset_index()
-    elif aggregation_method == AggregationMethod.MAX:
-        report = report.max().reset_index()
-    elif aggregation_method == AggregationMethod.MEDIAN:
-        report = report.median().reset_index()
-    elif aggregation_method == AggregationMethod.STD:
-        report = report.std().reset_index()
-    elif aggregation_method == AggregationMethod.COUNT:
-        report = report.count().reset_index()
-    elif aggregation_method == AggregationMethod.ROLLING_MEAN:
-        report = report.mean().rolling(window=3, min_periods=1).mean().reset_index()
-    else:
-        raise HTTPException(status_code=400, detail="Invalid aggregation method")
+    start, end = validate_range(hist_data_request.from_date, hist_data_request.to_date)
+    chunk = timedelta(days=HIST_CHUNK_DAYS)
+
+    if start is None or (end or datetime.now(timezone.utc)) - start <= chunk:
+        return clip_rows(await _get_chunk(hist_data_request), start, end)
+
+    windows = split_range(start, end or datetime.now(timezone.utc), chunk)
+
+    async def get_window(index: int, window_start: datetime, window_end: datetime):
+        # the outer bounds are kept as requested, an open end stays open
+        from_date = hist_data_request.from_date if index == 0 else format_date(window_start)
+        to_date = hist_data_request.to_date if index == len(windows) - 1 else format_date(window_end)
+
+        return await _get_chunk(hist_data_request.model_copy(update={"from_date": from_date, "to_date": to_date}))
+
+    chunks = await asyncio.gather(*(get_window(i, *window) for i, window in enumerate(windows)))
+
+    # neighbouring windows share their bound, so a reading taken exactly on it may come twice
+    return clip_rows(list({row["id"]: row for rows in chunks for row in rows}.values()), start, end)
+
+
+rollup_store = RollupStore(_get_data, SessionLocal)
+
+
+async def _open_data_stream(
+    hist_data_request: HistDataRequest
+) -> httpx.Response:
+    # opened before the export response starts, so upstream errors can still become a proper status code
+    response = await http_client.send(
+        http_client.build_request(
+            "GET",
+            os.getenv("DATA_URL"),
+            params=_upstream_params(hist_data_request)
+        ),
+        stream=True,
+    )
+
+    if response.status_code != 200:
+        await response.aclose()
+        raise HTTPException(status_code=response.status_code, detail="Failed to fetch data")
+
+    return response
+
+
+async def _stream_json(response: httpx.Response) -> AsyncIterator[bytes]:
+    try:
+        async for chunk in response.aiter_bytes():
+            yield chunk
+    finally:
+        await response.aclose()
+
+
+async def _stream_rows(response: httpx.Response, data_format: DataFormat) -> AsyncIterator[str]:
+    """
+    Re-encodes the upstream JSON array as CSV or NDJSON, EXPORT_BATCH_SIZE rows per chunk.
+    """
+    try:
+        buffer = io.StringIO()
+        writer = None
+        rows_in_buffer = 0
+
+        async for row in iter_json_array(response.aiter_bytes()):
+            if data_format == DataFormat.NDJSON:
+                buffer.write(json.dumps(row, ensure_ascii=False))
+                buffer.write("\n")
+            else:
+                if writer is None:
+                    writer = csv.DictWriter(buffer, fieldnames=list(row), extrasaction="ignore", lineterminator="\n")
+                    writer.writeheader()
+                writer.writerow(row)
+
+            rows_in_buffer += 1
+            if rows_in_buffer >= EXPORT_BATCH_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+                rows_in_buffer = 0
+
+        if buffer.tell():
+            yield buffer.getvalue()
+    finally:
+        await response.aclose()
 
-    report = report.applymap(lambda x: 0 if pd.isna(x) else x)
 
+async def _stream_columnar(response: httpx.Response, data_format: DataFormat,
+                           compression: Compression) -> AsyncIterator[bytes]:
+    try:
+        async for chunk in stream_rows(iter_json_array(response.aiter_bytes()), data_format, compression,
+                                       EXPORT_BATCH_SIZE):
+            yield chunk
+    finally:
+        await response.aclose()
+
+
+def _report_response(report: pd.DataFrame, data_format: DataFormat, compression: Compression):
     if data_format == DataFormat.JSON:
         return report.to_dict(orient='records')
     elif data_format == DataFormat.CSV:
@@ -92,29 +186,146 @@ async def generate_report(
         response = StreamingResponse(iter([stream.getvalue()]), media_type="text/csv")
         response.headers["Content-Disposition"] = "attachment; filename=historical_data.csv"
         return response
+    elif data_format in (DataFormat.PARQUET, DataFormat.ARROW):
+        response = Response(encode_frame(report, data_format, compression), media_type=MEDIA_TYPES[data_format])
+        response.headers["Content-Disposition"] = \
+            f"attachment; filename=historical_data.{FILE_EXTENSIONS[data_format]}"
+        return response
     else:
         raise HTTPException(status_code=400, detail="Invalid data format specified")
 
 
+@app.get("/historical_report")
+async def generate_report(
+    sensor: SensorType,
+    location: str,
+    period: AggrPeriod = AggrPeriod.DAILY,
+    aggregation_method: str = Query(
+        AggregationMethod.MEAN.value,
+        description="Comma separated aggregation methods, percentiles as pNN (example: mean,min,max,p95)"
+    ),
+    from_date: str = Query(None, description="RFC3339 format only (example: 2024-01-18T23:59:59Z"),
+    to_date: str = Query(None, description="RFC3339 format only (example: 2024-01-18T23:59:59Z"),
+    data_format: DataFormat = Query(DataFormat.JSON, description="Export format: json, csv, parquet, arrow"),
+    compression: Compression = Query(Compression.ZSTD, description="Compression of parquet and arrow exports"),
+):
+    methods = parse_aggregation_methods(aggregation_method)
+    validate_range(from_date, to_date)
+
+    if REPORT_ROLLUPS and can_use_rollups(methods):
+        daily = await rollup_store.daily(sensor.value, location, from_date, to_date)
+        report = aggregate_rollups(daily, period, methods)
+    else:
+        data = await _get_data(HistDataRequest(
+            sensor_type=sensor,
+            location=location,
+            from_date=from_date,
+            to_date=to_date
+        ))
+
+        df = pd.DataFrame(data, columns=['timestamp', 'value'])
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        df.set_index('timestamp', inplace=True)
+
+        df['value'] = pd.to_numeric(df['value'], errors='coerce')
+        df.dropna(subset=['value'], inplace=True)
+
+        report = aggregate(df['value'], period, methods)
+
+    return _report_response(report, data_format, compression)
+
+
+async def _gather_series(pairs: List[tuple[str, str]], fetch) -> pd.DataFrame:
+    """
+    Runs `fetch(location, sensor_type)` for every pair and stacks the returned frames into one table with
+    location and sensor_type columns. The upstream requests of all pairs share upstream_semaphore.
+    """
+    frames = await asyncio.gather(*(fetch(*pair) for pair in pairs))
+
+    return pd.concat(dict(zip(pairs, frames)), names=GROUP_KEYS + ["timestamp"]).reset_index()
+
+
+@app.get("/batch_historical_report")
+async def generate_batch_report(
+    locations: List[str] = Query(..., description="Locations to report on (repeat the parameter)"),
+    sensors: List[SensorType] = Query(list(SensorType), description="Sensor types to report on"),
+    period: AggrPeriod = AggrPeriod.DAILY,
+    aggregation_method: str = Query(
+        AggregationMethod.MEAN.value,
+        description="Comma separated aggregation methods, percentiles as pNN (example: mean,min,max,p95)"
+    ),
+    from_date: str = Query(None, description="RFC3339 format only (example: 2024-01-18T23:59:59Z"),
+    to_date: str = Query(None, description="RFC3339 format only (example: 2024-01-18T23:59:59Z"),
+    data_format: DataFormat = Query(DataFormat.JSON, description="Export format: json, csv, parquet, arrow"),
+    compression: Compression = Query(Compression.ZSTD, description="Compression of parquet and arrow exports"),
+):
+    """
+    The report of every (location, sensor type) pair in one table, aggregated with a single grouped
+    resample instead of one pipeline per pair.
+    """
+    methods = parse_aggregation_methods(aggregation_method)
+    validate_range(from_date, to_date)
+
+    pairs = list(dict.fromkeys((location, sensor.value) for location in locations for sensor in sensors))
+
+    if REPORT_ROLLUPS and can_use_rollups(methods):
+        async def fetch_rollups(location: str, sensor_type: str):
+            return await rollup_store.daily(sensor_type, location, from_date, to_date)
+
+        report = aggregate_rollup_groups(await _gather_series(pairs, fetch_rollups), period, methods)
+    else:
+        async def fetch_readings(location: str, sensor_type: str):
+            return readings_series(await _get_data(HistDataRequest(
+                sensor_type=sensor_type,
+                location=location,
+                from_date=from_date,
+                to_date=to_date
+            )))
+
+        report = aggregate_groups(await _gather_series(pairs, fetch_readings), period, methods)
+
+    return _report_response(report, data_format, compression)
+
+
 @app.get("/export_raw")
 async def export(
     hist_data_request: HistDataRequest = Depends(),
-    data_format: str = Query(default=DataFormat.CSV, description="Export format: json, csv"),
+    data_format: DataFormat = Query(default=DataFormat.CSV,
+                                    description="Export format: json, csv, ndjson, parquet, arrow"),
+    compression: Compression = Query(Compression.ZSTD, description="Compression of parquet and arrow exports"),
 ):
-    data = await _get_data(hist_data_request)
+    validate_range(hist_data_request.from_date, hist_data_request.to_date)
+    if data_format in (DataFormat.PARQUET, DataFormat.ARROW):
+        check_format(data_format, compression)
+
+    upstream_response = await _open_data_stream(hist_data_request)
 
     if data_format == DataFormat.CSV:
-        df = pd.DataFrame(data)
-        stream = io.StringIO()
-        df.to_csv(stream, index=False)
-        response = StreamingResponse(iter([stream.getvalue()]), media_type="text/csv")
+        response = StreamingResponse(_stream_rows(upstream_response, data_format), media_type="text/csv")
         response.headers["Content-Disposition"] = "attachment; filename=historical_data.csv"
         return response
+    elif data_format == DataFormat.NDJSON:
+        response = StreamingResponse(_stream_rows(upstream_response, data_format), media_type="application/x-ndjson")
+        response.headers["Content-Disposition"] = "attachment; filename=historical_data.ndjson"
+        return response
+    elif data_format in (DataFormat.PARQUET, DataFormat.ARROW):
+        response = StreamingResponse(_stream_columnar(upstream_response, data_format, compression),
+                                     media_type=MEDIA_TYPES[data_format])
+        response.headers["Content-Disposition"] = \
+            f"attachment; filename=historical_data.{FILE_EXTENSIONS[data_format]}"
+        return response
     elif data_format == DataFormat.JSON:
-        return data
+        # already in the requested format, passed through chunk by chunk
+        return StreamingResponse(_stream_json(upstream_response), media_type="application/json")
     else:
+        await upstream_response.aclose()
         raise HTTPException(status_code=400, detail="Invalid data format")
 
 
+@app.get("/metrics")
+async def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 if __name__ == "__main__":
     uvicorn.run(app, host=os.getenv("HOST"), port=int(os.getenv("PORT")))
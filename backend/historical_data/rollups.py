@@ -0,0 +1,161 @@
+import asyncio
+from collections import defaultdict
+from datetime import datetime, timezone, timedelta, date
+from typing import Awaitable, Callable, List, Dict, Optional
+
+import pandas as pd
+from sqlalchemy import delete, insert, select
+
+from backend.historical_data.aggregation import daily_rollups, ROLLUP_COLUMNS, ROLLUP_METHODS
+from backend.historical_data.database_model import DailyRollup, RollupWatermark
+from backend.historical_data.time_range import parse_date, format_date
+from backend.shared_models.sensor_data_model import HistDataRequest
+
+ONE_DAY = timedelta(days=1)
+
+
+def _start_of_day(value: datetime) -> datetime:
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _day_start(day: date) -> datetime:
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+
+
+def readings_series(data: List[Dict]) -> pd.Series:
+    df = pd.DataFrame(data, columns=["timestamp", "value"])
+
+    values = pd.Series(pd.to_numeric(df["value"], errors="coerce").to_numpy(),
+                       index=pd.DatetimeIndex(pd.to_datetime(df["timestamp"], utc=True)), name="value")
+    return values.dropna()
+
+
+def can_use_rollups(methods: List[str]) -> bool:
+    return all(method in ROLLUP_METHODS for method in methods)
+
+
+class RollupStore:
+    """
+    Daily count, sum, sum of squares, min and max of every (location, sensor type), kept in the database.
+
+    Days that ended can no longer change, so they are rolled up once, incrementally, the first time a
+    report needs them. Only the open day (and partial days cut by the requested interval) are
+    computed from raw readings.
+    """
+
+    def __init__(self,
+                 fetch: Callable[[HistDataRequest], Awaitable[List[Dict]]],
+                 session_factory):
+        self.fetch = fetch
+        self.session_factory = session_factory
+        self._locks = defaultdict(asyncio.Lock)
+
+    async def _raw_rollups(self, sensor_type: str, location: str, start: Optional[datetime], end: datetime,
+                           include_end: bool) -> pd.DataFrame:
+        data = await self.fetch(HistDataRequest(
+            sensor_type=sensor_type,
+            location=location,
+            from_date=format_date(start) if start is not None else None,
+            to_date=format_date(end),
+        ))
+
+        values = readings_series(data or [])
+        in_window = values.index <= end if include_end else values.index < end
+        if start is not None:
+            in_window &= values.index >= start
+
+        return daily_rollups(values[in_window])
+
+    def _load(self, sensor_type: str, location: str, first_day: Optional[date], end_day: date) -> pd.DataFrame:
+        query = select(DailyRollup).where(
+            DailyRollup.location == location,
+            DailyRollup.sensor_type == sensor_type,
+            DailyRollup.day < end_day,
+        )
+        if first_day is not None:
+            query = query.where(DailyRollup.day >= first_day)
+
+        with self.session_factory() as db:
+            rows = db.execute(query.order_by(DailyRollup.day)).scalars().all()
+
+        return pd.DataFrame(
+            [[getattr(row, column) for column in ROLLUP_COLUMNS] for row in rows],
+            columns=ROLLUP_COLUMNS,
+            index=pd.DatetimeIndex([_day_start(row.day) for row in rows], tz="UTC", name="timestamp"),
+            dtype="float64",
+        )
+
+    def _save(self, sensor_type: str, location: str, first_day: Optional[date], end_day: date,
+              rollups: pd.DataFrame):
+        with self.session_factory() as db:
+            # a refresh interrupted after the insert (but before the watermark moved) may have left some days
+            stale = delete(DailyRollup).where(
+                DailyRollup.location == location,
+                DailyRollup.sensor_type == sensor_type,
+                DailyRollup.day < end_day,
+            )
+            if first_day is not None:
+                stale = stale.where(DailyRollup.day >= first_day)
+            db.execute(stale)
+
+            if len(rollups):
+                db.execute(insert(DailyRollup), [
+                    {"location": location, "sensor_type": sensor_type, "day": day.date(),
+                     "count": int(row["count"]), "sum": row["sum"], "sum_sq": row["sum_sq"],
+                     "min": row["min"], "max": row["max"]}
+                    for day, row in zip(rollups.index, rollups.to_dict(orient="records"))
+                ])
+
+            db.merge(RollupWatermark(location=location, sensor_type=sensor_type, rolled_up_to=end_day))
+            db.commit()
+
+    async def refresh(self, sensor_type: str, location: str, today: date):
+        """
+        Rolls up the days between the watermark and `today` (exclusive).
+        """
+        async with self._locks[(location, sensor_type)]:
+            with self.session_factory() as db:
+                watermark = db.get(RollupWatermark, (location, sensor_type))
+                first_day = watermark.rolled_up_to if watermark is not None else None
+
+            if first_day is not None and first_day >= today:
+                return
+
+            start = _day_start(first_day) if first_day is not None else None
+            rollups = await self._raw_rollups(sensor_type, location, start, _day_start(today), include_end=False)
+
+            self._save(sensor_type, location, first_day, today, rollups)
+            print(f"Rolled up {len(rollups)} days of {sensor_type} readings in {location}")
+
+    async def daily(self, sensor_type: str, location: str, from_date: Optional[str] = None,
+                    to_date: Optional[str] = None) -> pd.DataFrame:
+        """
+        Daily rollups of the readings between `from_date` and `to_date` (both inclusive, `to_date`
+        defaults to now). Whole closed days come from the database, the rest from raw readings.
+        """
+        now = datetime.now(timezone.utc)
+        today = _start_of_day(now)
+
+        start = parse_date(from_date)
+        end = min(parse_date(to_date) or now, now)
+
+        await self.refresh(sensor_type, location, today.date())
+
+        first_full_day = _start_of_day(start) + ONE_DAY if start is not None and start != _start_of_day(start) \
+            else start
+        full_days_end = min(_start_of_day(end), today)
+
+        if start is not None and first_full_day >= full_days_end:
+            # the interval does not cover a whole closed day
+            return await self._raw_rollups(sensor_type, location, start, end, include_end=True)
+
+        frames = [self._load(sensor_type, location, first_full_day.date() if start is not None else None,
+                             full_days_end.date())]
+
+        if start is not None and start < first_full_day:
+            frames.append(await self._raw_rollups(sensor_type, location, start, first_full_day,
+                                                  include_end=False))
+        # the open day, or the part of the last day before `to_date`
+        frames.append(await self._raw_rollups(sensor_type, location, full_days_end, end, include_end=True))
+
+        return pd.concat([frame for frame in frames if len(frame)] or frames[:1]).sort_index()
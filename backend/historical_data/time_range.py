@@ -0,0 +1,63 @@
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+
+from fastapi import HTTPException
+
+
+def parse_date(value: Optional[str]) -> Optional[datetime]:
+    if value is None:
+        return None
+
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid RFC3339 date: {value}")
+
+    return parsed.astimezone(timezone.utc) if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def format_date(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def validate_range(from_date: Optional[str], to_date: Optional[str]) -> tuple[Optional[datetime], Optional[datetime]]:
+    start, end = parse_date(from_date), parse_date(to_date)
+
+    if start is not None and end is not None and start > end:
+        raise HTTPException(status_code=400, detail="from_date must not be after to_date")
+
+    return start, end
+
+
+def clip_rows(rows: list[dict], start: Optional[datetime], end: Optional[datetime]) -> list[dict]:
+    """
+    The rows whose timestamp lies in [start, end], whatever the upstream did with the requested window.
+    """
+    if start is None and end is None:
+        return rows
+
+    clipped = []
+    for row in rows:
+        try:
+            timestamp = parse_date(row["timestamp"])
+        except (HTTPException, KeyError, TypeError, AttributeError):
+            continue
+
+        if (start is None or timestamp >= start) and (end is None or timestamp <= end):
+            clipped.append(row)
+
+    return clipped
+
+
+def split_range(start: datetime, end: datetime, chunk: timedelta) -> list[tuple[datetime, datetime]]:
+    """
+    Consecutive windows of at most `chunk` covering [start, end]. Neighbouring windows share their bound.
+    """
+    windows = []
+
+    while end - start > chunk:
+        windows.append((start, start + chunk))
+        start += chunk
+
+    windows.append((start, end))
+    return windows
@@ -14,12 +14,26 @@ class AggregationMethod(str, Enum):
     MEDIAN = 'median'
     STD = 'std'
     COUNT = 'count'
+    SUM = 'sum'
+    FIRST = 'first'
+    LAST = 'last'
     ROLLING_MEAN = 'rolling_mean'
 
 
 class DataFormat(str, Enum):
     CSV = "csv"
     JSON = "json"
+    NDJSON = "ndjson"
+    PARQUET = "parquet"
+    ARROW = "arrow"
+
+
+class Compression(str, Enum):
+    NONE = "none"
+    SNAPPY = "snappy"
+    GZIP = "gzip"
+    LZ4 = "lz4"
+    ZSTD = "zstd"
 
 
 class SensorType(str, Enum):
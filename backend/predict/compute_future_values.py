@@ -1,122 +1,225 @@
+import asyncio
 import os
-from datetime import date
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from datetime import date, datetime, timezone
 from datetime import timedelta
+from typing import Awaitable, Callable, List, Optional
 from zoneinfo import ZoneInfo
 
 import httpx
+import numpy as np
 import pandas as pd
+from pydantic import TypeAdapter
 from dateutil.relativedelta import relativedelta
-from pmdarima.arima import auto_arima
+from pmdarima.arima import ARIMA, auto_arima
 from prophet import Prophet
+from sqlalchemy import delete, insert
 from sqlalchemy.orm import Session
 from tqdm import tqdm
 
-from predict.database_model import PressPredictedValue, TempPredictedValue, HumidPredictedValue, SessionLocal
+from predict.database_model import PredictedValue, SessionLocal, engine
+from predict.model_registry import ModelRecord, ModelRegistry
 from shared_models.sensor_data_model import DataResponse
+from utils.http_client import create_async_client
 
+data_responses_adapter = TypeAdapter(List[DataResponse])
 
-def get_historical_data(location: str) -> tuple[list[DataResponse], list[DataResponse], list[DataResponse]]:
+# the three month window is fetched as concurrent pages of at most this many days
+FORECAST_PAGE_DAYS = int(os.getenv("FORECAST_PAGE_DAYS", 14))
+# upstream requests in flight at the same time, over all locations and sensors
+FORECAST_FETCH_CONCURRENCY = int(os.getenv("FORECAST_FETCH_CONCURRENCY", 16))
+# sensors whose raw history is held in memory at the same time, before being reduced to hourly values
+FORECAST_LOADING_TASKS = int(os.getenv("FORECAST_LOADING_TASKS", 16))
+
+# fitted models of the previous runs, refitted from where they were instead of from scratch
+model_registry = ModelRegistry(os.getenv("FORECAST_MODEL_DIR", "forecast_models"),
+                               keep=int(os.getenv("FORECAST_MODEL_VERSIONS", 5)))
+# days after which the ARIMA orders are searched again and Prophet starts from its default initialization
+FORECAST_FULL_REFIT_DAYS = float(os.getenv("FORECAST_FULL_REFIT_DAYS", 7))
+# a warm refit whose recent error grew by more than this factor since the last full fit is done again in full
+FORECAST_DRIFT_FACTOR = float(os.getenv("FORECAST_DRIFT_FACTOR", 1.5))
+DRIFT_WINDOW_HOURS = 48
+
+
+def history_pages(page_days: int = FORECAST_PAGE_DAYS) -> list[tuple[str, str]]:
+    """
+    (from, to) windows covering the last three months, oldest first. Neighbouring windows share their bound.
+    """
     today = date.today() + relativedelta(days=1)
-    today_str = today.strftime('%Y-%m-%dT%H:%M:%SZ')
-
-    three_months_ago = today - relativedelta(months=3)
-    three_months_ago_str = three_months_ago.strftime('%Y-%m-%dT%H:%M:%SZ')
-
-    with httpx.Client() as client:
-        response = client.get(
-            os.getenv("HIST_SENSOR_DATA"),
-            params={
-                "sensor_type": "temperature",
-                "location": location,
-                "from": three_months_ago_str,
-                "to": today_str,
-            }
-        )
-        response.raise_for_status()
-        temperature_data = [DataResponse.model_validate(res) for res in response.json()] if response.json() else None
-
-    with httpx.Client() as client:
-        response = client.get(
-            os.getenv("HIST_SENSOR_DATA"),
-            params={
-                "sensor_type": "humidity",
-                "location": location,
-                "from": three_months_ago_str,
-                "to": today_str,
-            }
-        )
-        response.raise_for_status()
-        humidity_data = [DataResponse.model_validate(res) for res in response.json()] if response.json() else None
-
-    with httpx.Client() as client:
-        response = client.get(
-            os.getenv("HIST_SENSOR_DATA"),
-            params={
-                "sensor_type": "pressure",
-                "location": location,
-                "from": three_months_ago_str,
-                "to": today_str,
-            }
-        )
+    page_start = today - relativedelta(months=3)
+
+    pages = []
+    while page_start < today:
+        page_end = min(page_start + timedelta(days=page_days), today)
+        pages.append((page_start.strftime('%Y-%m-%dT%H:%M:%SZ'), page_end.strftime('%Y-%m-%dT%H:%M:%SZ')))
+        page_start = page_end
+
+    return pages
+
+
+async def get_sensor_history(
+    client: httpx.AsyncClient,
+    semaphore: asyncio.Semaphore,
+    location: str,
+    sensor_type: str,
+) -> list[DataResponse] | None:
+    async def get_page(from_date: str, to_date: str) -> list[DataResponse]:
+        async with semaphore:
+            response = await client.get(
+                os.getenv("HIST_SENSOR_DATA"),
+                params={
+                    "sensor_type": sensor_type,
+                    "location": location,
+                    "from": from_date,
+                    "to": to_date,
+                }
+            )
         response.raise_for_status()
-        pressure_data = [DataResponse.model_validate(res) for res in response.json()] if response.json() else None
 
-    return temperature_data, humidity_data, pressure_data
+        # parsed and validated in one pass, straight from the body
+        body = response.content
+        return data_responses_adapter.validate_json(body) if body.strip() not in (b"", b"null") else []
+
+    pages = await asyncio.gather(*(get_page(*page) for page in history_pages()))
+
+    # a reading taken exactly on the bound between two pages comes twice
+    data = list({entry.id: entry for page in pages for entry in page}.values())
+    return data or None
+
 
+def _recent_error(actual, fitted) -> float:
+    actual = np.asarray(actual, dtype=np.float64)[-DRIFT_WINDOW_HOURS:]
+    fitted = np.asarray(fitted, dtype=np.float64)[-DRIFT_WINDOW_HOURS:]
+    return float(np.nanmean(np.abs(actual - fitted)))
 
-def run_sarima(train, last_timestamp):
+
+def fit_incremental(kind: str, fit, train, actual, previous: Optional[ModelRecord]):
     """
-    Predict the next 2 hours in 15-minute intervals using SARIMA.
+    Fits a model starting from the previous record of the same sensor, when there is one.
+
+    The fit is done from scratch (`fit(train, None)`) when there is no usable record, when the last full fit
+    is older than FORECAST_FULL_REFIT_DAYS, or when the model refitted from the record drifted: its error on
+    the most recent hours grew by more than FORECAST_DRIFT_FACTOR since the last full fit.
+
+    Args:
+        fit: (train, params or None) -> (fitted model, params to store, in-sample predictions)
+        actual: the observed values the in-sample predictions are compared to
 
     Returns:
-        list of (timestamp, predicted_value)
-    """
-    model = auto_arima(
-        train,
-        start_p=1, start_q=1,
-        max_p=2, max_q=2,  # reduce from default (5)
-        d=None,  # let it infer
-        seasonal=True,
-        start_P=0, start_Q=0,
-        max_P=1, max_Q=1,  # reduce seasonal orders
-        D=None,
-        m=24,  # hourly seasonality (daily pattern)
-        trace=False,
-        stepwise=True,  # faster stepwise algorithm
-        error_action="ignore",  # skip non-converging models
-        suppress_warnings=True,
-        n_fits=10  # optional: cap number of models
+        (fitted model, record to store)
+    """
+    now = datetime.now(timezone.utc)
+    full_fit = previous is None or previous.kind != kind or \
+        now - previous.full_fit_at >= timedelta(days=FORECAST_FULL_REFIT_DAYS)
+
+    model, params, fitted = fit(train, None if full_fit else previous.params)
+    error = _recent_error(actual, fitted)
+
+    if not full_fit and error > FORECAST_DRIFT_FACTOR * previous.baseline_error:
+        print(f">>>Drift detected ({error:.3f} against {previous.baseline_error:.3f}), full {kind} refit")
+        full_fit = True
+        model, params, fitted = fit(train, None)
+        error = _recent_error(actual, fitted)
+
+    return model, ModelRecord(
+        kind=kind,
+        params=params,
+        fitted_at=now,
+        full_fit_at=now if full_fit else previous.full_fit_at,
+        baseline_error=error if full_fit else previous.baseline_error,
+        last_error=error,
     )
 
+
+def _fit_sarima(train, params):
+    if params is None:
+        model = auto_arima(
+            train,
+            start_p=1, start_q=1,
+            max_p=2, max_q=2,  # reduce from default (5)
+            d=None,  # let it infer
+            seasonal=True,
+            start_P=0, start_Q=0,
+            max_P=1, max_Q=1,  # reduce seasonal orders
+            D=None,
+            m=24,  # hourly seasonality (daily pattern)
+            trace=False,
+            stepwise=True,  # faster stepwise algorithm
+            error_action="ignore",  # skip non-converging models
+            suppress_warnings=True,
+            n_fits=10  # optional: cap number of models
+        )
+    else:
+        # the orders found by the last stepwise search, only the coefficients are estimated again
+        model = ARIMA(
+            order=tuple(params["order"]),
+            seasonal_order=tuple(params["seasonal_order"]),
+            with_intercept=params["with_intercept"],
+            suppress_warnings=True,
+        ).fit(train)
+
+    params = {
+        "order": list(model.order),
+        "seasonal_order": list(model.seasonal_order),
+        "with_intercept": bool(model.with_intercept),
+    }
+    return model, params, model.predict_in_sample()
+
+
+def run_sarima(train, last_timestamp, previous: Optional[ModelRecord] = None):
+    """
+    Predict the next 2 days in 1-hour intervals using SARIMA.
+
+    Returns:
+        (list of (timestamp, predicted_value), model record)
+    """
+    model, record = fit_incremental("sarima", _fit_sarima, train, train["value"], previous)
+
     n_periods = 48  # 2 days = 34560 intervals of 5 seconds
     forecast = model.predict(n_periods=n_periods)
 
     timestamps = [last_timestamp + timedelta(hours=1 * (i + 1)) for i in range(n_periods)]
-    return list(zip(timestamps, forecast))
+    return list(zip(timestamps, forecast)), record
+
 
+def _fit_prophet(df_train, params):
+    m = Prophet(
+        daily_seasonality=True,
+        weekly_seasonality=False,
+        yearly_seasonality=False
+    )
+    if params is None:
+        m.fit(df_train)
+    else:
+        # the optimizer starts from the previous solution instead of the default initialization
+        m.fit(df_train, init=params)
 
-def run_prophet(train_df, last_timestamp):
+    params = {name: float(m.params[name][0][0]) for name in ("k", "m", "sigma_obs")}
+    params.update({name: m.params[name][0].tolist() for name in ("delta", "beta")})
+
+    recent = m.predict(df_train[["ds"]].tail(DRIFT_WINDOW_HOURS))
+    return m, params, recent["yhat"].to_numpy()
+
+
+def run_prophet(train_df, last_timestamp, previous: Optional[ModelRecord] = None):
     """
     Predict the next 48 hours using Prophet.
 
     Args:
         train_df (pd.DataFrame): With columns ['timestamp', 'value'].
         last_timestamp (datetime): Last timestamp from training data.
+        previous (ModelRecord): Record of the last fit of the same sensor, if any.
 
     Returns:
-        list of (timestamp, predicted_value)
+        (list of (timestamp, predicted_value), model record)
     """
     last_timestamp = last_timestamp.replace(tzinfo=None)
 
     df_train = train_df.reset_index().rename(columns={"timestamp": "ds", "value": "y"})
     df_train['ds'] = pd.to_datetime(df_train['ds']).dt.tz_localize(None)
 
-    m = Prophet(
-        daily_seasonality=True,
-        weekly_seasonality=False,
-        yearly_seasonality=False
-    )
-    m.fit(df_train)
+    m, record = fit_incremental("prophet", _fit_prophet, df_train, df_train["y"], previous)
 
     future = pd.date_range(start=last_timestamp + timedelta(hours=1), periods=48, freq='h')
     future = future.tz_localize(None)
@@ -124,7 +227,7 @@ def run_prophet(train_df, last_timestamp):
 
     forecast = m.predict(future_df)
 
-    return list(zip(forecast["ds"], forecast["yhat"]))
+    return list(zip(forecast["ds"], forecast["yhat"])), record
 
 
 def prepare_sensor_series(data_responses):
@@ -140,53 +243,142 @@ def prepare_sensor_series(data_responses):
     return df
 
 
-AVAILABLE_LOCATIONS = ["building-a"]
+# forecasting function of every sensor type, the slowest to fit first
+SENSOR_MODELS = {
+    "pressure": run_sarima,
+    "temperature": run_prophet,
+    "humidity": run_prophet,
+}
 
-if __name__ == '__main__':
-    predict_db: Session = SessionLocal()
+FORECAST_WORKERS = int(os.getenv("FORECAST_WORKERS", os.cpu_count() or 1))
 
-    # delete entries
-    predict_db.query(TempPredictedValue).delete()
-    predict_db.query(HumidPredictedValue).delete()
-    predict_db.query(PressPredictedValue).delete()
-    predict_db.commit()
 
-    for location in tqdm(AVAILABLE_LOCATIONS):
-        print(f">>>Compute for: {location}")
+def new_run_id() -> str:
+    return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
 
-        th_data, hh_data, ph_data = get_historical_data(location)
 
-        # temperature
-        if th_data:
-            temperature_df = prepare_sensor_series(th_data)
-            raw_predicted_temperature_values = run_prophet(
-                temperature_df, th_data[0].timestamp.astimezone(ZoneInfo("Europe/Bucharest"))
-            )
-            predicted_temperature_values = [TempPredictedValue(value=val, location=location, timestamp=ts)
-                                            for ts, val in raw_predicted_temperature_values]
-            predict_db.add_all(predicted_temperature_values)
-            predict_db.commit()
-
-        # humidity
-        if hh_data:
-            humidity_df = prepare_sensor_series(hh_data)
-            raw_predicted_humidity_values = run_prophet(
-                humidity_df, hh_data[0].timestamp.astimezone(ZoneInfo("Europe/Bucharest"))
-            )
-            predicted_humidity_values = [HumidPredictedValue(value=val, location=location, timestamp=ts)
-                                         for ts, val in raw_predicted_humidity_values]
-            predict_db.add_all(predicted_humidity_values)
-            predict_db.commit()
-
-        # pressure
-        if ph_data:
-            pressure_df = prepare_sensor_series(ph_data)
-            raw_predicted_pressure_values = run_sarima(
-                pressure_df, ph_data[0].timestamp.astimezone(ZoneInfo("Europe/Bucharest"))
-            )
-            predicted_pressure_values = [PressPredictedValue(value=val, location=location, timestamp=ts)
-                                         for ts, val in raw_predicted_pressure_values]
-            predict_db.add_all(predicted_pressure_values)
-            predict_db.commit()
+def replace_predictions(db: Session, location: str, sensor_type: str, run_id: str, predicted_values: list) -> int:
+    """
+    Replaces the predicted values of one sensor of one location in a single transaction, so readers keep
+    seeing the previous predictions until the commit and never an empty result.
+    """
+    db.execute(delete(PredictedValue).where(PredictedValue.location == location,
+                                            PredictedValue.sensor_type == sensor_type))
+    if predicted_values:
+        # one executemany of plain rows, batched into multi-row INSERTs, instead of an ORM object per value
+        db.execute(insert(PredictedValue), [
+            {"sensor_type": sensor_type, "value": float(val), "location": location, "timestamp": ts,
+             "run_id": run_id}
+            for ts, val in predicted_values
+        ])
+    db.commit()
+
+    return len(predicted_values)
+
+
+def forecast_sensor(location: str, sensor_type: str, series: pd.DataFrame, last_timestamp: datetime,
+                    run_id: Optional[str] = None) -> int:
+    """
+    Fits the model of one sensor of one location and stores its predicted values, tagged with `run_id`
+    (a new one when not given). Runs in a worker process.
+
+    Returns:
+        number of predicted values written
+    """
+    run_model = SENSOR_MODELS[sensor_type]
+    raw_predicted_values, record = run_model(series, last_timestamp, model_registry.latest(location, sensor_type))
+
+    with SessionLocal() as predict_db:
+        replace_predictions(predict_db, location, sensor_type, run_id or new_run_id(), raw_predicted_values)
+
+    # saved after the predictions, so a run that failed to store them refits from the same record
+    model_registry.save(location, sensor_type, record)
+
+    return len(raw_predicted_values)
 
-    predict_db.close()
+
+async def load_sensor_series(
+    client: httpx.AsyncClient,
+    semaphore: asyncio.Semaphore,
+    location: str,
+    sensor_type: str,
+) -> Optional[tuple[pd.DataFrame, datetime]]:
+    """
+    Hourly series and latest reading time of one sensor, or None when it has no history.
+    """
+    data = await get_sensor_history(client, semaphore, location, sensor_type)
+    if not data:
+        return None
+
+    last_timestamp = max(entry.timestamp for entry in data)
+    return prepare_sensor_series(data), last_timestamp.astimezone(ZoneInfo("Europe/Bucharest"))
+
+
+def _init_worker():
+    # pooled connections inherited from the parent process must not be used by two processes
+    engine.dispose(close=False)
+
+
+async def _run_forecasts(
+    tasks: list[tuple[str, str]],
+    workers: int,
+    load: Callable[..., Awaitable[Optional[tuple[pd.DataFrame, datetime]]]],
+    forecast: Callable[[str, str, pd.DataFrame, datetime], int],
+):
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(FORECAST_FETCH_CONCURRENCY)
+    loading = asyncio.Semaphore(FORECAST_LOADING_TASKS)
+    results, failures = {}, {}
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool, \
+            tqdm(total=len(tasks)) as progress:
+        async with create_async_client() as client:
+            async def run_task(location: str, sensor_type: str):
+                try:
+                    # the parent process does all the I/O, every fit starts as soon as its history arrived
+                    async with loading:
+                        loaded = await load(client, semaphore, location, sensor_type)
+                    results[(location, sensor_type)] = 0 if loaded is None else \
+                        await loop.run_in_executor(pool, forecast, location, sensor_type, *loaded)
+                    print(f">>>Done: {location} {sensor_type} ({results[(location, sensor_type)]} values)")
+                except Exception as e:
+                    failures[(location, sensor_type)] = e
+                    print(f">>>Failed: {location} {sensor_type}: {e!r}")
+                finally:
+                    progress.update()
+
+            await asyncio.gather(*(run_task(*task) for task in tasks))
+
+    print(f">>>{len(results)} forecasts computed, {len(failures)} failed")
+    return results, failures
+
+
+def run_forecasts(tasks: list[tuple[str, str]], workers: int = FORECAST_WORKERS, load=load_sensor_series,
+                  forecast=forecast_sensor):
+    """
+    Loads the history of every (location, sensor type) task concurrently over one pooled client and
+    fits the models on a pool of `workers` processes. A failing task is reported and does not stop the others.
+
+    Returns:
+        ({task: result}, {task: exception})
+    """
+    return asyncio.run(_run_forecasts(tasks, workers, load, forecast))
+
+
+AVAILABLE_LOCATIONS = ["building-a"]
+
+
+def remove_other_locations(locations: list[str]):
+    """
+    Deletes the predictions of the locations that are no longer forecast.
+    """
+    with SessionLocal() as predict_db:
+        predict_db.execute(delete(PredictedValue).where(PredictedValue.location.not_in(locations)))
+        predict_db.commit()
+
+
+if __name__ == '__main__':
+    # every forecast replaces the predictions of its location, a failed one keeps the previous predictions
+    run_forecasts([(location, sensor_type) for sensor_type in SENSOR_MODELS for location in AVAILABLE_LOCATIONS],
+                  forecast=partial(forecast_sensor, run_id=new_run_id()))
+    remove_other_locations(AVAILABLE_LOCATIONS)
@@ -1,7 +1,7 @@
 import os
 
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime
+from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Index
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 load_dotenv()
@@ -11,31 +11,21 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
-class TempPredictedValue(Base):
-    __tablename__ = "TempPredictedValue"
+class PredictedValue(Base):
+    __tablename__ = "PredictedValue"
 
     inc = Column(Integer, primary_key=True, autoincrement=True)
+    sensor_type = Column(String, nullable=False)
     value = Column(Float, nullable=False)
     location = Column(String, nullable=False)
     timestamp = Column(DateTime, nullable=False)
+    # forecast run that produced the value
+    run_id = Column(String, nullable=False)
 
-
-class HumidPredictedValue(Base):
-    __tablename__ = "HumidPredictedValue"
-
-    inc = Column(Integer, primary_key=True, autoincrement=True)
-    value = Column(Float, nullable=False)
-    location = Column(String, nullable=False)
-    timestamp = Column(DateTime, nullable=False)
-
-
-class PressPredictedValue(Base):
-    __tablename__ = "PressPredictedValue"
-
-    inc = Column(Integer, primary_key=True, autoincrement=True)
-    value = Column(Float, nullable=False)
-    location = Column(String, nullable=False)
-    timestamp = Column(DateTime, nullable=False)
+    # /last_prediction filters on the location and sensor type and reads a timestamp range, in order
+    __table_args__ = (
+        Index("ix_PredictedValue_location_sensor_type_timestamp", "location", "sensor_type", "timestamp"),
+    )
 
 
 Base.metadata.create_all(bind=engine)
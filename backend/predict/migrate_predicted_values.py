@@ -0,0 +1,56 @@
+"""
+Moves the predicted values of the former per sensor tables (TempPredictedValue, HumidPredictedValue,
+PressPredictedValue) into the PredictedValue table, then drops them.
+
+Run once from the backend directory, before the new service version starts:
+    python -m predict.migrate_predicted_values [--keep-legacy]
+"""
+import argparse
+
+from sqlalchemy import MetaData, Table, delete, insert, inspect, literal, select
+
+from predict.database_model import PredictedValue, engine
+
+LEGACY_TABLES = {
+    "temperature": "TempPredictedValue",
+    "humidity": "HumidPredictedValue",
+    "pressure": "PressPredictedValue",
+}
+
+MIGRATED_RUN_ID = "migrated"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Migrate the per sensor prediction tables to PredictedValue.")
+    parser.add_argument("--keep-legacy", action="store_true", help="Do not drop the former tables.")
+    return parser.parse_args()
+
+
+def migrate(keep_legacy: bool = False):
+    existing = set(inspect(engine).get_table_names())
+
+    for sensor_type, table_name in LEGACY_TABLES.items():
+        if table_name not in existing:
+            print(f"{table_name}: not found, nothing to migrate")
+            continue
+
+        legacy = Table(table_name, MetaData(), autoload_with=engine)
+
+        # one transaction per table, so running the migration again replaces what it copied before
+        with engine.begin() as connection:
+            connection.execute(delete(PredictedValue).where(PredictedValue.sensor_type == sensor_type,
+                                                            PredictedValue.run_id == MIGRATED_RUN_ID))
+            copied = connection.execute(insert(PredictedValue).from_select(
+                ["sensor_type", "value", "location", "timestamp", "run_id"],
+                select(literal(sensor_type), legacy.c.value, legacy.c.location, legacy.c.timestamp,
+                       literal(MIGRATED_RUN_ID)),
+            )).rowcount
+
+            if not keep_legacy:
+                legacy.drop(connection)
+
+        print(f"{table_name}: {copied} values copied as {sensor_type}{'' if keep_legacy else ', table dropped'}")
+
+
+if __name__ == "__main__":
+    migrate(parse_args().keep_legacy)
@@ -0,0 +1,79 @@
+import os
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import quote
+
+from pydantic import BaseModel, ValidationError
+
+
+class ModelRecord(BaseModel):
+    """
+    What a later run needs to refit the model of one sensor without starting over: the ARIMA orders
+    or the Prophet parameters, and the error the model had on the most recent hours.
+    """
+    kind: str
+    version: int = 0
+    params: Dict[str, Any]
+    fitted_at: datetime
+    # the last fit that searched the orders / started Prophet from its default initialization
+    full_fit_at: datetime
+    # mean absolute in-sample error over the most recent hours, at the last full fit and at this fit
+    baseline_error: float
+    last_error: float
+
+
+class ModelRegistry:
+    """
+    Versioned model records on the local disk, one directory per (location, sensor type):
+
+        <root>/<location>/<sensor type>/000042.json
+
+    Every save writes a new version and only the `keep` most recent ones are kept.
+    """
+
+    def __init__(self, root: str, keep: int = 5):
+        self.root = Path(root)
+        self.keep = keep
+
+    def _directory(self, location: str, sensor_type: str) -> Path:
+        return self.root / quote(location, safe="") / quote(sensor_type, safe="")
+
+    def versions(self, location: str, sensor_type: str) -> List[int]:
+        directory = self._directory(location, sensor_type)
+        if not directory.is_dir():
+            return []
+
+        return sorted(int(path.stem) for path in directory.glob("*.json") if path.stem.isdigit())
+
+    def latest(self, location: str, sensor_type: str) -> Optional[ModelRecord]:
+        versions = self.versions(location, sensor_type)
+        if not versions:
+            return None
+
+        path = self._directory(location, sensor_type) / f"{versions[-1]:06d}.json"
+        try:
+            return ModelRecord.model_validate_json(path.read_bytes())
+        except (OSError, ValidationError) as e:
+            # the model is fitted from scratch and the next save replaces the unreadable version
+            print(f"Ignoring the stored model of {sensor_type} in {location}: {e}")
+            return None
+
+    def save(self, location: str, sensor_type: str, record: ModelRecord) -> int:
+        directory = self._directory(location, sensor_type)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        versions = self.versions(location, sensor_type)
+        record = record.model_copy(update={"version": versions[-1] + 1 if versions else 1})
+
+        # written next to its final name and renamed, so a reader never sees a partial record
+        descriptor, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(descriptor, "w") as record_file:
+            record_file.write(record.model_dump_json())
+        os.replace(temporary, directory / f"{record.version:06d}.json")
+
+        for version in (versions + [record.version])[:-self.keep]:
+            (directory / f"{version:06d}.json").unlink(missing_ok=True)
+
+        return record.version
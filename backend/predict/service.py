@@ -4,11 +4,12 @@ from zoneinfo import ZoneInfo
 
 import uvicorn
 from dotenv import load_dotenv
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
-from predict.database_model import SessionLocal, TempPredictedValue, HumidPredictedValue, PressPredictedValue
-from shared_models.sensor_data_model import DataResponse
+from predict.database_model import SessionLocal, PredictedValue
+from shared_models.sensor_data_model import DataResponse, ResponseFormat
+from utils.columnar import columnar_response
 
 app = FastAPI()
 
@@ -35,15 +36,10 @@ async def get_last_prediction(
     location: str,
     sensor_type: str,
     from_date: datetime = None,
+    response_format: ResponseFormat = Query(ResponseFormat.OBJECTS, description="objects, columnar, arrow"),
     db: Session = Depends(_get_db),
 ) -> list[DataResponse]:
-    if sensor_type == "temperature":
-        query_class = TempPredictedValue
-    elif sensor_type == "humidity":
-        query_class = HumidPredictedValue
-    elif sensor_type == "pressure":
-        query_class = PressPredictedValue
-    else:
+    if sensor_type not in SENSOR_TYPE_TO_UNIT:
         raise HTTPException(404, "Unknown sensor type")
 
     if not from_date:
@@ -51,11 +47,17 @@ async def get_last_prediction(
     else:
         cutoff_date = from_date
 
-    query = db.query(query_class).filter_by(location=location).filter(query_class.timestamp > cutoff_date)
+    # a range scan of the (location, sensor_type, timestamp) index, only the two needed columns are loaded
+    query = db.query(PredictedValue.value, PredictedValue.timestamp).filter(
+        PredictedValue.location == location,
+        PredictedValue.sensor_type == sensor_type,
+        PredictedValue.timestamp > cutoff_date,
+    ).order_by(PredictedValue.timestamp)
 
+    # rows come from our own table, they do not need to be validated again
     predicted_data = []
     for res in query:
-        predicted_data.append(DataResponse(
+        predicted_data.append(DataResponse.model_construct(
             id="",
             device_id="",
             sensor_type=sensor_type,
@@ -68,6 +70,9 @@ async def get_last_prediction(
             floor=0
         ))
 
+    if response_format != ResponseFormat.OBJECTS:
+        return columnar_response(predicted_data, response_format)
+
     return predicted_data
 
 if __name__ == "__main__":
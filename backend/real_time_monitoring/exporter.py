@@ -6,7 +6,8 @@ from dotenv import load_dotenv
 from fastapi import FastAPI, Response
 from prometheus_client import Gauge, generate_latest, CONTENT_TYPE_LATEST
 
-from backend.shared_models.sensor_data_model import DataResponse
+from backend.utils.real_time_store import ALL_READINGS_INDEX
+from backend.utils.sensor_codec import decode_reading
 
 app = FastAPI()
 
@@ -22,10 +23,15 @@ pressure_gauge = Gauge('sensor_pressure', 'Real-time pressure data', ['location'
 
 
 def update_metrics():
-    keys = redis_client.keys("*")
+    keys = list(redis_client.smembers(ALL_READINGS_INDEX))
+    if not keys:
+        return
 
-    for key in keys:
-        data = DataResponse.model_validate(eval(redis_client.get(key)))
+    for raw_data in redis_client.mget(keys):
+        if raw_data is None:
+            continue
+
+        data = decode_reading(raw_data)
         device_id = data.device_id
         sensor_type = data.sensor_type
         value = data.value
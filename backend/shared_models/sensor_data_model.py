@@ -1,5 +1,6 @@
 from datetime import datetime
-from typing import Optional
+from enum import Enum
+from typing import List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -28,3 +29,21 @@ class DataResponse(BaseModel):
     latitude: float
     longitude: float
     floor: int
+
+
+class ResponseFormat(str, Enum):
+    OBJECTS = "objects"
+    COLUMNAR = "columnar"
+    ARROW = "arrow"
+
+
+class SensorSeries(BaseModel):
+    device_id: str
+    sensor_type: str
+    unit: str
+    location: str
+    latitude: float
+    longitude: float
+    floor: int
+    timestamps: List[datetime]
+    values: List[float]
@@ -0,0 +1,85 @@
+import io
+from typing import Iterable, List
+
+from fastapi import HTTPException, Response
+from pydantic import TypeAdapter
+
+try:
+    from backend.shared_models.sensor_data_model import SensorSeries, ResponseFormat
+except ModuleNotFoundError:
+    # the predict service runs from the backend directory, with top-level imports
+    from shared_models.sensor_data_model import SensorSeries, ResponseFormat
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:
+    pa = None
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+sensor_series_adapter = TypeAdapter(List[SensorSeries])
+
+
+def to_series(readings: Iterable) -> List[SensorSeries]:
+    """
+    Groups readings (anything with the DataResponse attributes) into one series per device, sensor type and
+    location, so the metadata is sent once instead of once per point.
+    """
+    grouped = {}
+
+    for reading in readings:
+        key = (reading.device_id, reading.sensor_type, reading.location)
+
+        series = grouped.get(key)
+        if series is None:
+            # the readings are already validated, no need to validate them again
+            series = grouped[key] = SensorSeries.model_construct(
+                device_id=reading.device_id,
+                sensor_type=reading.sensor_type,
+                unit=reading.unit,
+                location=reading.location,
+                latitude=reading.latitude,
+                longitude=reading.longitude,
+                floor=reading.floor,
+                timestamps=[],
+                values=[],
+            )
+
+        series.timestamps.append(reading.timestamp)
+        series.values.append(reading.value)
+
+    return list(grouped.values())
+
+
+def to_arrow_ipc(readings: Iterable) -> bytes:
+    """
+    Arrow IPC stream with the same layout as the columnar JSON: one row per series, its points as list columns.
+    """
+    if pa is None:
+        raise HTTPException(status_code=400, detail="The arrow format requires pyarrow to be installed")
+
+    series = to_series(readings)
+
+    table = pa.table({
+        **{field: pa.array([getattr(s, field) for s in series], pa.string())
+           for field in ("device_id", "sensor_type", "unit", "location")},
+        "latitude": pa.array([s.latitude for s in series], pa.float64()),
+        "longitude": pa.array([s.longitude for s in series], pa.float64()),
+        "floor": pa.array([s.floor for s in series], pa.int32()),
+        "timestamps": pa.array([s.timestamps for s in series], pa.list_(pa.timestamp("us", tz="UTC"))),
+        "values": pa.array([s.values for s in series], pa.list_(pa.float64())),
+    })
+
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    return sink.getvalue()
+
+
+def columnar_response(readings: Iterable, response_format: ResponseFormat) -> Response:
+    if response_format == ResponseFormat.ARROW:
+        return Response(to_arrow_ipc(readings), media_type=ARROW_STREAM_MEDIA_TYPE)
+
+    return Response(sensor_series_adapter.dump_json(to_series(readings)), media_type="application/json")
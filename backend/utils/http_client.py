@@ -0,0 +1,55 @@
+import importlib.util
+import os
+import time
+
+import httpx
+from prometheus_client import Counter, Gauge, Histogram
+
+UPSTREAM_IN_FLIGHT = Gauge('upstream_requests_in_flight', 'Upstream HTTP requests currently holding a connection')
+UPSTREAM_MAX_CONNECTIONS = Gauge('upstream_pool_max_connections', 'Size of the upstream HTTP connection pool')
+UPSTREAM_POOL_TIMEOUTS = Counter('upstream_pool_timeouts', 'Upstream requests that timed out waiting for a connection')
+UPSTREAM_LATENCY = Histogram('upstream_request_seconds', 'Upstream HTTP request latency until response headers')
+
+
+class _InstrumentedTransport(httpx.AsyncHTTPTransport):
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        UPSTREAM_IN_FLIGHT.inc()
+        start_time = time.perf_counter()
+
+        try:
+            return await super().handle_async_request(request)
+        except httpx.PoolTimeout:
+            UPSTREAM_POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            UPSTREAM_IN_FLIGHT.dec()
+            UPSTREAM_LATENCY.observe(time.perf_counter() - start_time)
+
+
+def create_async_client() -> httpx.AsyncClient:
+    """
+    Pooled client meant to live for the whole lifespan of a service, so upstream calls reuse
+    keep-alive connections instead of paying a TCP/TLS handshake per request.
+    """
+    max_connections = int(os.getenv("HTTP_MAX_CONNECTIONS", 100))
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", 20)),
+        keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 30)),
+    )
+    timeout = httpx.Timeout(
+        float(os.getenv("HTTP_TIMEOUT", 30)),
+        connect=float(os.getenv("HTTP_CONNECT_TIMEOUT", 5)),
+        pool=float(os.getenv("HTTP_POOL_TIMEOUT", 10)),
+    )
+
+    # HTTP/2 needs the optional h2 package
+    http2 = os.getenv("HTTP2", "auto")
+    http2 = importlib.util.find_spec("h2") is not None if http2 == "auto" else http2.lower() == "true"
+
+    UPSTREAM_MAX_CONNECTIONS.set(max_connections)
+
+    return httpx.AsyncClient(
+        transport=_InstrumentedTransport(limits=limits, http2=http2),
+        timeout=timeout,
+    )
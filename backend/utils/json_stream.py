@@ -0,0 +1,74 @@
+import codecs
+import json
+from typing import Any, AsyncIterator
+
+_WHITESPACE = " \t\n\r"
+
+
+async def iter_json_array(chunks: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    """
+    Yields the items of a top-level JSON array as its bytes arrive, so only the current item
+    (and not the whole document) has to be held in memory. A top-level `null` yields nothing.
+    """
+    decoder = json.JSONDecoder()
+    utf8_decoder = codecs.getincrementaldecoder("utf-8")()
+
+    buffer = ""
+    started = False
+    finished = False
+
+    async def read_more() -> bool:
+        nonlocal buffer, finished
+        try:
+            buffer += utf8_decoder.decode(await anext(chunks))
+        except StopAsyncIteration:
+            buffer += utf8_decoder.decode(b"", final=True)
+            finished = True
+        return not finished
+
+    chunks = aiter(chunks)
+    pos = 0
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+            pos += 1
+
+        if pos == len(buffer):
+            buffer, pos = "", 0
+            if not await read_more() and not buffer.strip():
+                return
+            continue
+
+        if not started:
+            if buffer[pos] == "n":
+                return
+            if buffer[pos] != "[":
+                raise ValueError("Expected a JSON array")
+            started = True
+            pos += 1
+            continue
+
+        if buffer[pos] == ",":
+            pos += 1
+            continue
+
+        if buffer[pos] == "]":
+            return
+
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # the item is split across chunks
+            buffer, pos = buffer[pos:], 0
+            if not await read_more():
+                raise
+            continue
+
+        # a scalar cut at the end of the buffer (e.g. '12' of '123') parses, but may not be complete
+        if end == len(buffer) and not finished:
+            buffer, pos = buffer[pos:], 0
+            await read_more()
+            continue
+
+        yield item
+        pos = end
@@ -0,0 +1,19 @@
+import sys
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def peak_rss_mb() -> float:
+    """
+    Peak resident set size of the current process, NaN where the platform does not report it.
+    """
+    if resource is None:
+        return float("nan")
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # macOS reports bytes, Linux kilobytes
+    return peak_rss / (1024 * 1024) if sys.platform == "darwin" else peak_rss / 1024
@@ -0,0 +1,81 @@
+from typing import Optional
+
+KEY_DELIM = "|"
+
+INDEX_PREFIX = "index"
+ALL_READINGS_INDEX = KEY_DELIM.join((INDEX_PREFIX, "all"))
+
+READINGS_CHANNEL = "readings"
+
+# every valid reading of each ingested batch, for the single process that evaluates the alert rules
+INGESTED_CHANNEL = "ingested"
+
+# most recent alerts first, capped list of JSON encoded alerts
+ALERTS_KEY = "alerts"
+ALERTS_CHANNEL = "alerts"
+# lease of the process that evaluates the alert rules and emails the alerts
+ALERTS_OWNER_KEY = KEY_DELIM.join(("alerts", "owner"))
+
+FLOORS_KEY = KEY_DELIM.join(("plan", "floors"))
+BOOTSTRAP_LOCK_KEY = KEY_DELIM.join(("bootstrap", "lock"))
+
+
+def reading_key(device_id: str, sensor_type: str, location: str) -> str:
+    return KEY_DELIM.join((device_id, sensor_type, location))
+
+
+def split_reading_key(key: str) -> tuple[str, str, str]:
+    device_id, sensor_type, location = key.split(KEY_DELIM)
+    return device_id, sensor_type, location
+
+
+def _index_key(field: str, value: str) -> str:
+    return KEY_DELIM.join((INDEX_PREFIX, field, value))
+
+
+def index_keys(device_id: str, sensor_type: str, location: str) -> tuple[str, ...]:
+    """
+    Names of the Redis sets a reading key must be added to, so that it can be found
+    by any combination of device / sensor type / location filters.
+    """
+    return (
+        ALL_READINGS_INDEX,
+        _index_key("device_id", device_id),
+        _index_key("sensor_type", sensor_type),
+        _index_key("location", location),
+    )
+
+
+def query_index_keys(
+    device_id: Optional[str] = None,
+    sensor_type: Optional[str] = None,
+    location: Optional[str] = None,
+) -> list[str]:
+    """
+    Names of the Redis sets whose intersection (SINTER) holds the reading keys matching the filters.
+    """
+    keys = []
+
+    if device_id is not None:
+        keys.append(_index_key("device_id", device_id))
+    if sensor_type is not None:
+        keys.append(_index_key("sensor_type", sensor_type))
+    if location is not None:
+        keys.append(_index_key("location", location))
+
+    return keys or [ALL_READINGS_INDEX]
+
+
+def floor_locations_key(floor: int) -> str:
+    return KEY_DELIM.join(("plan", "floor", str(floor)))
+
+
+def location_sensors_key(location: str) -> str:
+    return KEY_DELIM.join(("plan", "sensors", location))
+
+
+def series_key(key: str) -> str:
+    """
+    Sorted set of the recent readings of one reading key, scored by their UNIX timestamp.
+    """
+    return KEY_DELIM.join(("series", key))
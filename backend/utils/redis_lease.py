@@ -0,0 +1,86 @@
+import asyncio
+import os
+import socket
+import uuid
+from typing import Awaitable, Callable
+
+from redis.exceptions import RedisError, WatchError
+
+
+class RedisLease:
+    """
+    A Redis key held by at most one process at a time. The holder renews its TTL every third of it,
+    so when the holder dies another process takes over after at most `ttl` seconds.
+    """
+
+    def __init__(self, redis_client, key: str, ttl: float = 15):
+        self.redis_client = redis_client
+        self.key = key
+        self.ttl = ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    async def acquire(self) -> bool:
+        return bool(await self.redis_client.set(self.key, self.owner, nx=True, px=int(self.ttl * 1000)))
+
+    async def _if_owner(self, update: Callable) -> bool:
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(self.key)
+                if await pipe.get(self.key) != self.owner:
+                    return False
+
+                pipe.multi()
+                update(pipe)
+                await pipe.execute()
+                return True
+            except WatchError:
+                return False
+
+    async def renew(self) -> bool:
+        return await self._if_owner(lambda pipe: pipe.pexpire(self.key, int(self.ttl * 1000)))
+
+    async def release(self) -> bool:
+        return await self._if_owner(lambda pipe: pipe.delete(self.key))
+
+    async def hold(self, run: Callable[[], Awaitable[None]]):
+        """
+        Waits for the lease and runs `run` for as long as it is held. When the lease is lost (Redis
+        unreachable, renewal too late), `run` is cancelled and the lease is waited for again.
+        """
+        while True:
+            try:
+                if not await self.acquire():
+                    await asyncio.sleep(self.ttl / 3)
+                    continue
+            except (RedisError, OSError) as e:
+                print(f"Failed to acquire {self.key}: {e!r}")
+                await asyncio.sleep(self.ttl / 3)
+                continue
+
+            print(f"Holding {self.key} as {self.owner}")
+            task = asyncio.create_task(run())
+
+            try:
+                while not task.done():
+                    await asyncio.wait({task}, timeout=self.ttl / 3)
+
+                    try:
+                        if not task.done() and not await self.renew():
+                            print(f"Lost {self.key}")
+                            break
+                    except (RedisError, OSError) as e:
+                        print(f"Failed to renew {self.key}: {e!r}")
+                        break
+            finally:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+
+                try:
+                    await self.release()
+                except (RedisError, OSError):
+                    # the TTL releases it
+                    pass
+
+            if not task.cancelled() and task.exception() is not None:
+                print(f"{self.key} holder failed: {task.exception()!r}")
+                await asyncio.sleep(self.ttl / 3)